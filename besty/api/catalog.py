@@ -0,0 +1,143 @@
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+from besty.api.product_search import LIST_FIELDS
+
+# Sync is keyed on ``modified``; bookkeeping writes (fingerprints, last_checked)
+# skip it, so only changes to the columns below reach clients.
+SYNC_FIELDS = LIST_FIELDS
+
+DEFAULT_PAGE_LENGTH = 5000
+MAX_PAGE_LENGTH = 20000
+
+# Rows committed by a transaction that started before the previous sync can
+# carry an older ``modified``; re-reading this window catches them.
+SYNC_OVERLAP_SECONDS = 60
+
+# Older watermarks get a fresh snapshot instead of a delta
+MAX_WATERMARK_AGE_DAYS = 30
+
+@frappe.whitelist()
+def sync_catalog(since=None, cursor=None, page_length=DEFAULT_PAGE_LENGTH, version=None):
+    """
+    Product Items for a client-side catalog cache.
+
+    Without ``since`` (or with one too old to replay) this pages through a full
+    snapshot and returns ``full: true``, telling the client to replace its
+    cache. With ``since`` it returns only rows modified after it, plus the names
+    of deleted items. Rows are lists in ``fields`` order. Follow
+    ``next_cursor`` until it is null, then keep ``watermark`` as the next
+    ``since``.
+
+    The catalog version is sent as the ETag header. When the client passes the
+    version it already has, nothing else is queried and ``unchanged`` is true.
+    """
+    frappe.has_permission('Product Item', 'read', throw=True)
+    page_length = min(cint(page_length) or DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH)
+
+    current_version = get_catalog_version()
+    set_etag(current_version)
+    if not cursor and since and current_version in (version, get_if_none_match()):
+        return {'unchanged': True, 'version': current_version, 'watermark': since}
+
+    if cursor:
+        mode, started, position = decode_cursor(cursor)
+    else:
+        started = now_datetime()
+        mode = 'delta' if since and is_replayable(since) else 'snapshot'
+        position = (None, 0) if mode == 'snapshot' else (
+            add_to_date(get_datetime(since), seconds=-SYNC_OVERLAP_SECONDS), 0
+        )
+
+    if mode == 'snapshot':
+        rows = get_snapshot_rows(position[1], page_length)
+        last = rows[-1] if rows else None
+        next_position = (None, last[0]) if last else None
+    else:
+        rows = get_changed_rows(position, page_length)
+        last = rows[-1] if rows else None
+        next_position = (last[-1], last[0]) if last else None
+
+    return {
+        'full': mode == 'snapshot',
+        'fields': SYNC_FIELDS,
+        'rows': [row[:len(SYNC_FIELDS)] for row in rows],
+        'deleted': get_deleted_names(position[0]) if mode == 'delta' and not cursor else [],
+        'next_cursor': encode_cursor(mode, started, next_position) if len(rows) == page_length else None,
+        'watermark': str(started),
+        'version': current_version
+    }
+
+def get_catalog_version():
+    """
+    Changes whenever a synced row is inserted, modified or deleted: inserts and
+    updates move the latest ``modified`` and deletes the latest Deleted Document.
+    Both are single index lookups, so polling never counts the table.
+    """
+    latest, deleted = frappe.db.sql("""
+        select
+            (select max(modified) from `tabProduct Item`),
+            (select max(creation) from `tabDeleted Document` where deleted_doctype = 'Product Item')
+    """)[0]
+    return hashlib.sha1(f'{latest}|{deleted}'.encode()).hexdigest()[:16]
+
+def set_etag(version):
+    frappe.local.response_headers.set('ETag', f'"{version}"')
+
+def get_if_none_match():
+    return (frappe.get_request_header('If-None-Match') or '').strip('"')
+
+def is_replayable(since):
+    try:
+        since = get_datetime(since)
+    except Exception:
+        return False
+    return since > add_to_date(now_datetime(), days=-MAX_WATERMARK_AGE_DAYS)
+
+def encode_cursor(mode, started, position):
+    modified, name = position
+    return '|'.join((mode, str(started), str(modified or ''), str(name)))
+
+def decode_cursor(cursor):
+    try:
+        mode, started, modified, name = cursor.split('|')
+        if mode not in ('snapshot', 'delta'):
+            raise ValueError(mode)
+        return mode, get_datetime(started), (get_datetime(modified) if modified else None, cint(name))
+    except Exception:
+        frappe.throw(_("Invalid sync cursor"))
+
+def get_snapshot_rows(after_name, page_length):
+    """The next page of every Product Item in name order."""
+    return frappe.db.sql(f"""
+        select {', '.join(f'`{field}`' for field in SYNC_FIELDS)}
+        from `tabProduct Item`
+        where name > %s
+        order by name
+        limit %s
+    """, (after_name, page_length))
+
+def get_changed_rows(position, page_length):
+    """
+    The next page of Product Items modified after ``position``, a
+    ``(modified, name)`` pair; ``modified`` is appended to each row so the
+    caller can build the next cursor.
+    """
+    modified, name = position
+    return frappe.db.sql(f"""
+        select {', '.join(f'`{field}`' for field in SYNC_FIELDS)}, modified
+        from `tabProduct Item`
+        where modified > %(modified)s or (modified = %(modified)s and name > %(name)s)
+        order by modified, name
+        limit %(page_length)s
+    """, {'modified': modified, 'name': name, 'page_length': page_length})
+
+def get_deleted_names(since):
+    return frappe.get_all('Deleted Document',
+        filters={'deleted_doctype': 'Product Item', 'creation': ('>=', since)},
+        pluck='deleted_name',
+        limit_page_length=0
+    )
@@ -0,0 +1,41 @@
+import frappe
+from frappe.utils import cint
+
+from besty.category_facets import ALL_SITES
+
+FACET_FIELDS = [
+    'category_name', 'level', 'parent_category', 'source_site', 'item_count',
+    'normalized_unit', 'min_unit_price', 'median_unit_price', 'max_unit_price'
+]
+
+@frappe.whitelist()
+def get_category_facets(level=1, source_site=None, parent_category=None):
+    """
+    Categories with their item count and min/median price per unit, read from
+    the maintained Category Facet table.
+
+    ``level`` 1 lists top categories and 2 product types, which
+    ``parent_category`` narrows to one top category. Without ``source_site``
+    the counts cover every shop.
+    """
+    frappe.has_permission('Product Item', 'read', throw=True)
+    filters = {'level': cint(level) or 1, 'source_site': source_site or ALL_SITES}
+    if parent_category:
+        filters['parent_category'] = parent_category
+    return frappe.get_all('Category Facet',
+        filters=filters,
+        fields=FACET_FIELDS,
+        order_by='item_count desc, category_name asc',
+        limit_page_length=0
+    )
+
+@frappe.whitelist()
+def get_site_facets(category_name, level=1):
+    """One category's counts and prices for each shop, plus the all-shops row."""
+    frappe.has_permission('Product Item', 'read', throw=True)
+    return frappe.get_all('Category Facet',
+        filters={'category_name': category_name, 'level': cint(level) or 1},
+        fields=FACET_FIELDS,
+        order_by='source_site asc',
+        limit_page_length=0
+    )
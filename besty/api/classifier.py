@@ -0,0 +1,27 @@
+import frappe
+
+from besty.classification_stats import get_site_stats, reset_site_stats, stats
+from besty.frappe_product_classifier import get_classifier_stats
+
+@frappe.whitelist()
+def get_stats():
+    """
+    Classification pipeline stats: per-stage timings, counters and the match
+    type histogram summed over all workers (``site``), plus this worker's own
+    figures and loaded classifiers (``process``).
+    """
+    frappe.only_for('System Manager')
+    stats.flush(force=True)
+    return {
+        'site': get_site_stats(),
+        'process': {
+            **stats.snapshot(),
+            **get_classifier_stats()
+        }
+    }
+
+@frappe.whitelist(methods=['POST'])
+def reset_stats():
+    """Clear the site-wide totals; per-process figures reset when workers restart."""
+    frappe.only_for('System Manager')
+    reset_site_stats()
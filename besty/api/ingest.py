@@ -0,0 +1,209 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, flt, get_datetime, now_datetime
+
+from besty.category_facets import reprice_facets
+from besty.frappe_product_classifier import enqueue_classification
+from besty.price_comparison import comparison_key
+from besty.price_history import record_prices
+from besty.search_index import index_products
+from besty.unit_normalization import normalized_unit_prices
+
+# Scraper-owned Product Item fields an upsert may set
+TEXT_FIELDS = ('productname', 'size', 'image_url', 'unit_name')
+NUMBER_FIELDS = ('unit_price', 'original_unit_quantity', 'current_price')
+SIZE_FIELDS = ('size', 'unit_name', 'original_unit_quantity')
+UNIT_PRICE_FIELDS = ('current_price', *SIZE_FIELDS)
+
+MAX_ROWS = 5000
+LOOKUP_CHUNK_SIZE = 1000
+
+# Sequence behind the autoincrement Product Item name
+NAME_SEQUENCE = 'product_item_id_seq'
+
+@frappe.whitelist(methods=['POST'])
+def upsert_products(products, source_site=None):
+    """
+    Insert or update many scraped Product Items keyed on (source_site, product_id).
+
+    Each row is diffed against the stored item: new items are bulk inserted,
+    changed ones bulk updated, and unchanged ones only get ``last_checked``
+    stamped. Price changes are appended to the price history, and new or
+    renamed items are queued for classification. Returns counts plus the
+    index and reason of every rejected row.
+    """
+    frappe.only_for('System Manager')
+    products = frappe.parse_json(products) if isinstance(products, str) else products
+    if not isinstance(products, list):
+        frappe.throw(_("products must be a list of product rows"))
+    if len(products) > MAX_ROWS:
+        frappe.throw(_("At most {0} products can be upserted per call").format(MAX_ROWS))
+
+    now = now_datetime()
+    rows, errors = clean_rows(products, source_site)
+    existing = get_existing(rows)
+
+    inserts = []
+    updates = {}
+    unchanged = []
+    observations = []
+    renamed = []
+    repriced = {}
+    for key, row in rows.items():
+        current = existing.get(key)
+        if not current:
+            inserts.append(row)
+            continue
+
+        changes = diff_row(current, row)
+        if not changes:
+            unchanged.append(current.name)
+            continue
+
+        changes['last_checked'] = now
+        if 'current_price' in changes:
+            changes['last_updated'] = row.get('last_updated') or now
+            observations.append((current.name, changes['current_price'], changes['last_updated']))
+        if 'productname' in changes:
+            renamed.append((current.name, changes['productname']))
+        if any(field in changes for field in SIZE_FIELDS):
+            merged = {**current, **changes}
+            changes['comparison_key'] = comparison_key(
+                current.category, merged['size'], merged['unit_name'], merged['original_unit_quantity']
+            )
+        if any(field in changes for field in UNIT_PRICE_FIELDS):
+            repriced[current.name] = {**current, **changes}
+        updates[current.name] = changes
+
+    set_unit_prices(repriced.values(), [updates[name] for name in repriced])
+
+    inserted = insert_rows(inserts, now)
+    observations.extend((name, row['current_price'], row.get('last_updated') or now) for name, row in inserted)
+
+    if updates:
+        frappe.db.bulk_update('Product Item', updates)
+    if unchanged:
+        # Seen again at the same price: bookkeeping, not a content change
+        frappe.db.set_value('Product Item', {'name': ('in', unchanged)}, 'last_checked', now, update_modified=False)
+
+    record_prices(observations)
+    # The repriced rows were merged before set_unit_prices, so they still hold the stored unit price
+    reprice_facets({
+        name: (
+            (row.get('normalized_unit'), flt(row.get('normalized_unit_price'), 4)),
+            (updates[name]['normalized_unit'], flt(updates[name]['normalized_unit_price'], 4))
+        )
+        for name, row in repriced.items()
+    })
+    index_products([(name, row['productname']) for name, row in inserted] + renamed)
+    enqueue_classification([name for name, row in inserted] + [name for name, productname in renamed])
+
+    return {
+        'inserted': len(inserted),
+        'updated': len(updates),
+        'unchanged': len(unchanged),
+        'errors': errors
+    }
+
+def clean_rows(products, source_site):
+    """Validate incoming rows and key them on (source_site, product_id); later duplicates win."""
+    rows = {}
+    errors = []
+    for index, product in enumerate(products):
+        if not isinstance(product, dict):
+            errors.append({'index': index, 'error': _("Each product must be an object")})
+            continue
+        site = cstr(product.get('source_site') or source_site).strip()
+        product_id = cstr(product.get('product_id')).strip()
+        productname = cstr(product.get('productname')).strip()
+        if not site or not product_id or not productname:
+            errors.append({'index': index, 'error': _("source_site, product_id and productname are required")})
+            continue
+
+        row = {'source_site': site, 'product_id': product_id}
+        for field in TEXT_FIELDS:
+            if field in product:
+                row[field] = cstr(product[field]).strip()
+        for field in NUMBER_FIELDS:
+            if field in product:
+                row[field] = flt(product[field])
+        if product.get('last_updated'):
+            try:
+                row['last_updated'] = get_datetime(product['last_updated'])
+            except Exception:
+                errors.append({'index': index, 'error': _("Invalid last_updated")})
+                continue
+        rows[(site, product_id)] = row
+    return rows, errors
+
+def get_existing(rows):
+    """Stored Product Items for the incoming keys, one query per site and id chunk."""
+    ids_by_site = {}
+    for site, product_id in rows:
+        ids_by_site.setdefault(site, []).append(product_id)
+
+    existing = {}
+    for site, product_ids in ids_by_site.items():
+        for i in range(0, len(product_ids), LOOKUP_CHUNK_SIZE):
+            for item in frappe.get_all('Product Item',
+                    filters={'source_site': site, 'product_id': ('in', product_ids[i:i + LOOKUP_CHUNK_SIZE])},
+                    fields=['name', 'source_site', 'product_id', 'category', *TEXT_FIELDS, *NUMBER_FIELDS,
+                        'normalized_unit', 'normalized_unit_price'],
+                    order_by='creation asc, name asc',
+                    limit_page_length=0):
+                # Keep the oldest item if duplicates already exist, as the duplicate merge does
+                existing.setdefault((item.source_site, item.product_id), item)
+    return existing
+
+def diff_row(current, row):
+    changes = {}
+    for field in TEXT_FIELDS:
+        if field in row and cstr(current.get(field)) != row[field]:
+            changes[field] = row[field]
+    for field in NUMBER_FIELDS:
+        if field in row and flt(current.get(field)) != row[field]:
+            changes[field] = row[field]
+    return changes
+
+def set_unit_prices(rows, targets):
+    """Store normalized_unit and normalized_unit_price for ``rows`` on the matching ``targets``."""
+    rows = list(rows)
+    for target, (unit, unit_price) in zip(targets, normalized_unit_prices([
+            tuple(row.get(field) for field in UNIT_PRICE_FIELDS) for row in rows])):
+        target['normalized_unit'] = unit
+        target['normalized_unit_price'] = unit_price
+
+def insert_rows(rows, now):
+    """Bulk insert new Product Items; returns ``[(name, row)]``."""
+    if not rows:
+        return []
+
+    fields = [
+        'name', 'creation', 'modified', 'owner', 'modified_by', 'source_site', 'product_id',
+        *TEXT_FIELDS, *NUMBER_FIELDS, 'normalized_unit', 'normalized_unit_price', 'last_updated', 'last_checked'
+    ]
+    rows = [{
+        'original_unit_quantity': 1, 'current_price': 0, **row,
+        'last_updated': row.get('last_updated') or now
+    } for row in rows]
+    set_unit_prices(rows, rows)
+
+    inserted = []
+    values = []
+    for name, row in zip(reserve_names(len(rows)), rows):
+        # category and comparison_key are filled in by the queued classification
+        values.append([
+            name, now, now, frappe.session.user, frappe.session.user, row['source_site'], row['product_id'],
+            *(row.get(field) for field in TEXT_FIELDS), *(row.get(field) for field in NUMBER_FIELDS),
+            row['normalized_unit'], row['normalized_unit_price'], row['last_updated'], now
+        ])
+        inserted.append((name, row))
+
+    frappe.db.bulk_insert('Product Item', fields, values)
+    return inserted
+
+def reserve_names(count):
+    """``count`` unused Product Item names, drawn from its sequence in one query."""
+    return [name for name, in frappe.db.sql(
+        f"select nextval(`{NAME_SEQUENCE}`) from seq_1_to_{cint(count)}"
+    )]
@@ -0,0 +1,55 @@
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, get_datetime, now_datetime
+
+MAX_WINDOW_DAYS = 3650
+MAX_POINTS = 500
+
+@frappe.whitelist()
+def get_latest_price(product):
+    """Most recent observation for a Product Item, or None."""
+    frappe.has_permission('Product Item', doc=product, throw=True)
+    rows = frappe.get_all('Product Price',
+        filters={'product': product},
+        fields=['price', 'observed_at'],
+        order_by='observed_at desc',
+        limit_page_length=1
+    )
+    return rows[0] if rows else None
+
+@frappe.whitelist()
+def get_price_stats(product, days=30):
+    """Min, max and average price of a Product Item over the last ``days`` days."""
+    frappe.has_permission('Product Item', doc=product, throw=True)
+    return frappe.db.sql("""
+        select min(price) as min_price, max(price) as max_price, avg(price) as avg_price,
+            count(*) as observations, min(observed_at) as first_observed, max(observed_at) as last_observed
+        from `tabProduct Price`
+        where product = %(product)s and observed_at >= %(since)s
+    """, {'product': product, 'since': window_start(days)}, as_dict=True)[0]
+
+@frappe.whitelist()
+def get_price_series(product, days=90, points=60):
+    """
+    Price series for charts, downsampled in SQL to at most ``points`` buckets
+    over the last ``days`` days, each with its min, max and average price.
+    """
+    frappe.has_permission('Product Item', doc=product, throw=True)
+    points = min(max(cint(points), 1), MAX_POINTS)
+    since = window_start(days)
+    bucket_seconds = max(int((now_datetime() - since).total_seconds() // points), 1)
+
+    return frappe.db.sql("""
+        select from_unixtime(floor(unix_timestamp(observed_at) / %(bucket)s) * %(bucket)s) as bucket_start,
+            min(price) as min_price, max(price) as max_price, avg(price) as avg_price, count(*) as observations
+        from `tabProduct Price`
+        where product = %(product)s and observed_at >= %(since)s
+        group by floor(unix_timestamp(observed_at) / %(bucket)s)
+        order by bucket_start
+    """, {'product': product, 'since': since, 'bucket': bucket_seconds}, as_dict=True)
+
+def window_start(days):
+    days = cint(days)
+    if days <= 0 or days > MAX_WINDOW_DAYS:
+        frappe.throw(_("Window must be between 1 and {0} days").format(MAX_WINDOW_DAYS))
+    return get_datetime(add_days(now_datetime(), -days))
@@ -1,14 +1,129 @@
+import base64
+import json
+
 import frappe
+from frappe import _
+from frappe.utils import cint
+
+from besty.price_comparison import get_cheapest_in_category, get_comparisons
+from besty.search_index import SORT_KEYS, get_product_conditions, keyset_condition, order_clause, search, sort_keys
+
+# Columns the product list renders; price history is served by besty.api.price_history
+LIST_FIELDS = [
+    'name', 'productname', 'category', 'source_site', 'size', 'image_url',
+    'unit_price', 'unit_name', 'original_unit_quantity', 'current_price', 'last_updated',
+    'normalized_unit', 'normalized_unit_price'
+]
+
+MAX_PAGE_LENGTH = 100
+
+@frappe.whitelist()
+def search_products(query=None, filters=None, sort=None, cursor=None, page_length=20):
+    """
+    Return one page of Product Items matching a search query.
+
+    ``filters`` may hold ``source_site``, ``category``, ``min_price`` and
+    ``max_price``. ``cursor`` is the ``next_cursor`` of the previous page; it
+    holds that page's last sort key, so the next page starts right after it
+    however deep it is, and rows added meanwhile don't shift it. A numeric
+    cursor is read as an offset, as older clients sent.
+    Queries are answered from the search index and ranked by relevance unless
+    another ``sort`` is given.
+    Returns ``{"results": [...], "total": n, "next_cursor": cursor or None}``.
+    """
+    sort = sort or ('relevance' if query else 'last_updated')
+    if sort not in SORT_KEYS:
+        frappe.throw(_("Unsupported sort order: {0}").format(sort))
+
+    filters = frappe.parse_json(filters) if filters else {}
+    start, after = decode_cursor(cursor, sort)
+    page_length = min(cint(page_length) or 20, MAX_PAGE_LENGTH)
+
+    # Fetch one extra row to learn whether another page exists without a second query
+    if query and query.strip():
+        names, total, keys = search(query, filters, order=sort, start=start, page_length=page_length + 1,
+            after=after)
+        rows = {row.name: row for row in frappe.get_list('Product Item',
+            fields=LIST_FIELDS,
+            filters={'name': ('in', names)},
+            limit_page_length=0
+        )} if names else {}
+        results = [rows[name] for name in names[:page_length] if name in rows]
+    else:
+        if sort == 'relevance':
+            sort = 'last_updated'
+        results, total, keys = browse(filters, sort, start, page_length + 1, after)
+
+    return {
+        'results': results[:page_length],
+        'total': total,
+        'next_cursor': encode_cursor(sort, keys[page_length - 1]) if len(keys) > page_length else None
+    }
+
+def browse(filters, sort, start, page_length, after):
+    """Product Items without a query, in ``sort`` order; returns ``(rows, total, sort keys)``."""
+    frappe.has_permission('Product Item', 'read', throw=True)
+    values = {'start': start, 'page_length': page_length}
+    conditions = get_product_conditions(filters, values)
+    total = frappe.db.sql(f"select count(*) from `tabProduct Item` p where 1 = 1 {conditions}", values)[0][0]
+
+    keys = sort_keys(sort)
+    if after:
+        conditions += f' and {keyset_condition(keys, after, values)}'
+    rows = frappe.db.sql(f"""
+        select {', '.join(f'p.`{field}`' for field in LIST_FIELDS)}
+        from `tabProduct Item` p
+        where 1 = 1 {conditions}
+        order by {order_clause(keys)}
+        limit %(start)s, %(page_length)s
+    """, values, as_dict=True)
+    return rows, total, [[row[expression[2:]] for expression, direction in keys] for row in rows]
+
+def encode_cursor(sort, key):
+    return base64.urlsafe_b64encode(json.dumps([sort, key], default=str).encode()).decode()
+
+def decode_cursor(cursor, sort):
+    """``(offset, sort key)`` of a cursor: a keyset cursor for this sort order, or a legacy offset."""
+    if not cursor:
+        return 0, None
+    if str(cursor).isdigit():
+        return cint(cursor), None
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+        if cursor_sort != sort or len(key) != len(sort_keys(sort)):
+            raise ValueError(cursor_sort)
+        return 0, key
+    except Exception:
+        frappe.throw(_("Invalid search cursor"))
 
 @frappe.whitelist()
 def fetch_comparison(product_name):
     """
-    Example API to return mock price data for a product.
+    Cheapest equivalent offer from each site for a Product Item, by unit price.
+
+    ``product_name`` is the Product Item name; an exact product name is also
+    accepted.
+    """
+    name = product_name if frappe.db.exists('Product Item', product_name) else \
+        frappe.db.get_value('Product Item', {'productname': product_name}, 'name')
+    if not name:
+        return []
+    return get_comparisons([name])[cint(name)]
+
+@frappe.whitelist()
+def fetch_comparisons(products):
+    """Batch form of fetch_comparison for a list of Product Item names, e.g. a whole shopping list."""
+    names = frappe.parse_json(products) if isinstance(products, str) else products
+    if not isinstance(names, list) or not all(isinstance(name, (str, int)) for name in names):
+        frappe.throw(_("products must be a list of Product Item names"))
+    if len(names) > MAX_PAGE_LENGTH:
+        frappe.throw(_("At most {0} products can be compared at once").format(MAX_PAGE_LENGTH))
+    return get_comparisons(names)
+
+@frappe.whitelist()
+def fetch_cheapest(category, normalized_unit=None, source_site=None, limit=10):
+    """
+    Cheapest Product Items of a category by price per kg, L or each, grouped by
+    that unit. ``normalized_unit`` and ``source_site`` narrow the lookup.
     """
-    # Mock data: Replace with actual scraping or API integration
-    results = [
-        {"site": "Amazon", "price": 19.99, "shipping": 10.00, "total_price": 29.99},
-        {"site": "eBay", "price": 18.50, "shipping": 12.00, "total_price": 30.50},
-        {"site": "PriceSpy", "price": 20.00, "shipping": 5.00, "total_price": 25.00},
-    ]
-    return results
+    return get_cheapest_in_category(category, normalized_unit, source_site, min(cint(limit) or 10, MAX_PAGE_LENGTH))
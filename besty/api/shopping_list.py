@@ -0,0 +1,159 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+IN_BASKET = 'In Basket'
+NOT_IN_BASKET = 'Not in Basket'
+
+OPERATIONS = ('add', 'remove', 'set_quantity', 'set_in_basket')
+MAX_OPERATIONS = 500
+
+@frappe.whitelist()
+def get_shopping_list(shopping_list):
+    """A Shopping List's items joined with their products, plus its revision and totals."""
+    frappe.has_permission('Shopping List', doc=shopping_list, throw=True)
+    list_name, revision = frappe.db.get_value('Shopping List', shopping_list, ['list_name', 'revision'])
+    items = frappe.db.sql("""
+        select item.product as name, coalesce(product.productname, item.product) as productname,
+            item.price as current_price, item.quantity,
+            coalesce(product.source_site, item.source_site) as source_site,
+            product.image_url, item.inbasket
+        from `tabShopping Item` item
+        left join `tabProduct Item` product on product.name = item.product
+        where item.parenttype = 'Shopping List' and item.parentfield = 'shopping_items'
+            and item.parent = %s
+        order by item.idx
+    """, shopping_list, as_dict=True)
+    return {
+        'list_name': list_name,
+        'revision': cint(revision),
+        'items': items,
+        'totals': get_totals(items, 'current_price')
+    }
+
+@frappe.whitelist(methods=['POST'])
+def apply_changes(shopping_list, revision, operations):
+    """
+    Apply item-level ``operations`` to a Shopping List that is still at
+    ``revision``, writing only the rows they touch.
+
+    Each operation names a ``product`` and an ``op``:
+
+    - ``add`` puts it on the list with ``quantity`` (default 1), or sets the
+      quantity if it is already there
+    - ``remove`` takes it off the list
+    - ``set_quantity`` changes its ``quantity``; zero or less removes it
+    - ``set_in_basket`` sets ``in_basket`` (true/false or the Select value)
+
+    A stale ``revision`` raises TimestampMismatchError so the client reloads.
+    Returns the new revision and the list totals by shop.
+    """
+    frappe.has_permission('Shopping List', 'write', doc=shopping_list, throw=True)
+    operations = parse_operations(operations)
+
+    # The row lock serializes concurrent patches of the same list
+    current = frappe.db.sql("select revision from `tabShopping List` where name = %s for update", shopping_list)
+    if cint(current[0][0]) != cint(revision):
+        frappe.throw(
+            _("This shopping list was changed elsewhere. Reload it and try again."),
+            frappe.TimestampMismatchError
+        )
+
+    rows = {}
+    for row in frappe.get_all('Shopping Item',
+            filters={'parenttype': 'Shopping List', 'parentfield': 'shopping_items', 'parent': shopping_list},
+            fields=['name', 'product', 'price', 'quantity', 'source_site', 'inbasket', 'idx'],
+            order_by='idx asc'):
+        if row.product in rows:
+            # Merge duplicates left by whole-list saves into the first row
+            rows[row.product].quantity += cint(row.quantity)
+            rows[row.product].changes['quantity'] = rows[row.product].quantity
+            frappe.db.delete('Shopping Item', {'name': row.name})
+            continue
+        row.changes = {}
+        rows[row.product] = row
+    next_idx = max((row.idx for row in rows.values()), default=0) + 1
+
+    for operation in operations:
+        op, product = operation['op'], str(operation['product'])
+        row = rows.get(product)
+
+        if op == 'add' and not row:
+            rows[product] = add_item(shopping_list, product, max(cint(operation.get('quantity', 1)), 1),
+                in_basket_value(operation.get('in_basket', False)), next_idx)
+            next_idx += 1
+        elif not row:
+            # Already gone, e.g. removed from another tab
+            continue
+        elif op == 'remove' or (op == 'set_quantity' and cint(operation.get('quantity')) <= 0):
+            frappe.db.delete('Shopping Item', {'name': row.name})
+            del rows[product]
+        elif op in ('add', 'set_quantity'):
+            row.quantity = max(cint(operation.get('quantity', 1)), 1)
+            row.changes['quantity'] = row.quantity
+        else:
+            row.inbasket = in_basket_value(operation.get('in_basket'))
+            row.changes['inbasket'] = row.inbasket
+
+    for row in rows.values():
+        if row.changes:
+            frappe.db.set_value('Shopping Item', row.name, row.changes)
+
+    revision = cint(revision) + 1
+    frappe.db.set_value('Shopping List', shopping_list, 'revision', revision)
+    return {
+        'revision': revision,
+        'totals': get_totals(rows.values(), 'price')
+    }
+
+def parse_operations(operations):
+    """The ``operations`` payload as a list of dicts, each with a known ``op`` and a ``product``."""
+    operations = frappe.parse_json(operations) if isinstance(operations, str) else operations
+    if not isinstance(operations, list):
+        frappe.throw(_("Shopping list changes must be a list"))
+    if len(operations) > MAX_OPERATIONS:
+        frappe.throw(_("At most {0} changes can be applied per call").format(MAX_OPERATIONS))
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS \
+                or not isinstance(operation.get('product'), (str, int)) or operation['product'] == '':
+            frappe.throw(_("Invalid shopping list change: {0}").format(operation))
+    return operations
+
+def add_item(shopping_list, product, quantity, inbasket, idx):
+    """Insert one Shopping Item priced from the Product Item as it is now."""
+    price, source_site = frappe.db.get_value('Product Item', product, ['current_price', 'source_site']) or (None, None)
+    if price is None and source_site is None:
+        frappe.throw(_("Product Item {0} not found").format(product))
+    row = frappe.get_doc({
+        'doctype': 'Shopping Item',
+        'parent': shopping_list,
+        'parenttype': 'Shopping List',
+        'parentfield': 'shopping_items',
+        'idx': idx,
+        'product': product,
+        'price': price,
+        'quantity': quantity,
+        'source_site': source_site,
+        'inbasket': inbasket
+    })
+    row.db_insert()
+    return frappe._dict(name=row.name, product=product, price=flt(price), quantity=quantity,
+        source_site=source_site, inbasket=inbasket, idx=idx, changes={})
+
+def in_basket_value(value):
+    if value in (IN_BASKET, NOT_IN_BASKET):
+        return value
+    return IN_BASKET if cint(value) else NOT_IN_BASKET
+
+def get_totals(items, price_field):
+    """List total plus in-basket and not-in-basket totals, overall and per shop."""
+    totals = {'subtotal': 0.0, 'in_basket': 0.0, 'not_in_basket': 0.0, 'by_source_site': {}}
+    for item in items:
+        amount = flt(item.get(price_field)) * cint(item.get('quantity'))
+        basket = 'in_basket' if item.get('inbasket') == IN_BASKET else 'not_in_basket'
+        site = totals['by_source_site'].setdefault(item.get('source_site') or '',
+            {'subtotal': 0.0, 'in_basket': 0.0, 'not_in_basket': 0.0})
+        for entry in (totals, site):
+            entry['subtotal'] += amount
+            entry[basket] += amount
+    return totals
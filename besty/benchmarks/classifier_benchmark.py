@@ -0,0 +1,209 @@
+# apps/besty/besty/benchmarks/classifier_benchmark.py
+#
+# Speed and accuracy of ProductClassifier over the bundled labeled corpus:
+#
+#   bench --site <site> execute besty.benchmarks.classifier_benchmark.run
+#   bench --site <site> execute besty.benchmarks.classifier_benchmark.run --kwargs "{'baseline': 'before.json'}"
+#   bench --site <site> execute besty.benchmarks.classifier_benchmark.run --kwargs "{'semantic': 1, 'backend': 'onnx'}"
+#   python -m besty.benchmarks.classifier_benchmark [output.json] [baseline.json]
+#
+# Results are printed as JSON (and written to ``output`` when given). With a
+# ``baseline`` from an earlier run, regressions beyond the tolerances below
+# are listed under "regressions".
+
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+from besty.classification_stats import stats
+from besty.embedding_backends import DEFAULT_BACKEND
+from besty.frappe_product_classifier import ProductClassifier
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'labeled_products.csv')
+
+# Allowed drift against a baseline before a run counts as a regression
+ACCURACY_TOLERANCE = 0.005
+THROUGHPUT_TOLERANCE = 0.2
+
+
+def load_corpus(path=CORPUS_PATH):
+    """``[(product_name, expected_category)]`` from a two-column CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['product_name'], row['category']) for row in csv.DictReader(f)]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` in seconds, reported in ms."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return 1000 * ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def latency_summary(values):
+    return {
+        'count': len(values),
+        'p50_ms': percentile(values, 50),
+        'p99_ms': percentile(values, 99),
+        'max_ms': 1000 * max(values) if values else None
+    }
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes (ru_maxrss is KiB on Linux)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def import_seconds():
+    """Time to import the hook module in a fresh interpreter."""
+    code = (
+        "import time, frappe\n"
+        "started = time.perf_counter()\n"
+        "import besty.frappe_product_classifier\n"
+        "print(time.perf_counter() - started)\n"
+    )
+    return float(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout)
+
+
+def accuracy_report(corpus, results):
+    confusion = defaultdict(Counter)
+    for (product_name, expected), result in zip(corpus, results):
+        confusion[expected][result['category']] += 1
+
+    per_category = {}
+    predicted_totals = Counter(result['category'] for result in results)
+    for category, row in sorted(confusion.items()):
+        correct = row[category]
+        per_category[category] = {
+            'support': sum(row.values()),
+            'recall': correct / sum(row.values()),
+            'precision': correct / predicted_totals[category] if predicted_totals[category] else 0.0
+        }
+
+    correct = sum(row[category] for category, row in confusion.items())
+    return {
+        'accuracy': correct / len(corpus),
+        'per_category': per_category,
+        'confusion': {category: dict(row) for category, row in sorted(confusion.items())},
+        'errors': [
+            {'product_name': product_name, 'expected': expected, 'predicted': result['category'],
+                'matched_word': result['matched_word'], 'match_type': result['match_type']}
+            for (product_name, expected), result in zip(corpus, results)
+            if result['category'] != expected
+        ]
+    }
+
+
+def benchmark_single(classifier, names):
+    """classify_single_product per name; latency is grouped by the match stage that answered."""
+    by_match_type = defaultdict(list)
+    results = []
+    started = time.perf_counter()
+    for product_name in names:
+        call_started = time.perf_counter()
+        result = classifier.classify_single_product(product_name)
+        by_match_type[result['match_type']].append(time.perf_counter() - call_started)
+        results.append(result)
+    seconds = time.perf_counter() - started
+
+    return results, {
+        'seconds': seconds,
+        'names_per_second': len(names) / seconds if seconds else None,
+        'latency': latency_summary([value for values in by_match_type.values() for value in values]),
+        'latency_by_match_type': {
+            match_type: latency_summary(values) for match_type, values in sorted(by_match_type.items())
+        },
+        'match_types': {match_type: len(values) for match_type, values in sorted(by_match_type.items())}
+    }
+
+
+def benchmark_many(classifier, names):
+    started = time.perf_counter()
+    results = classifier.classify_many(names)
+    seconds = time.perf_counter() - started
+    return results, {'seconds': seconds, 'names_per_second': len(names) / seconds if seconds else None}
+
+
+def run(semantic=False, repeat=3, corpus_path=None, output=None, baseline=None, backend=DEFAULT_BACKEND, threads=None):
+    """
+    Benchmark classify_single_product and classify_many over the corpus.
+
+    Caches are disabled so every pass measures real classification work; the
+    corpus is repeated ``repeat`` times for steadier timings. ``semantic``
+    includes the embedding model, whose load is then part of cold start;
+    ``backend`` and ``threads`` choose how it runs (see embedding_backends).
+    """
+    corpus = load_corpus(corpus_path or CORPUS_PATH)
+    names = [product_name for product_name, expected in corpus] * repeat
+
+    started = time.perf_counter()
+    classifier = ProductClassifier(semantic=semantic, cache_size=0, backend=backend, threads=threads)
+    classifier.classify_single_product(corpus[0][0])
+    if semantic:
+        classifier.semantic_match('warmup')
+    cold_start_seconds = time.perf_counter() - started
+
+    stats.collect_samples()
+    single_results, single = benchmark_single(classifier, names)
+    single['stages'] = {stage: latency_summary(values) for stage, values in sorted(stats.samples.items())}
+
+    stats.collect_samples()
+    many_results, many = benchmark_many(classifier, names)
+    many['stages'] = {stage: latency_summary(values) for stage, values in sorted(stats.samples.items())}
+    stats.collect_samples(False)
+
+    results = {
+        'corpus': {'path': corpus_path or CORPUS_PATH, 'names': len(corpus), 'repeat': repeat},
+        'classifier': {
+            'version': classifier.version, 'semantic': semantic, 'backend': backend, 'threads': threads,
+            'keywords': len(classifier.keywords)
+        },
+        'import_seconds': import_seconds(),
+        'cold_start_seconds': cold_start_seconds,
+        'peak_rss': peak_rss(),
+        'single': single,
+        'many': many,
+        'batch_matches_single': [
+            (result['category'], result['matched_word']) for result in many_results
+        ] == [(result['category'], result['matched_word']) for result in single_results],
+        **accuracy_report(corpus, single_results[:len(corpus)])
+    }
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            results['regressions'] = compare(json.load(f), results)
+
+    text = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return results
+
+
+def compare(baseline, results):
+    """Accuracy or throughput drops beyond the tolerances, as readable strings."""
+    regressions = []
+    if results['accuracy'] < baseline['accuracy'] - ACCURACY_TOLERANCE:
+        regressions.append(f"accuracy {baseline['accuracy']:.3f} -> {results['accuracy']:.3f}")
+    for path in ('single', 'many'):
+        before = baseline[path]['names_per_second']
+        after = results[path]['names_per_second']
+        if before and after and after < before * (1 - THROUGHPUT_TOLERANCE):
+            regressions.append(f"{path} throughput {before:.0f} -> {after:.0f} names/s")
+
+    newly_wrong = (
+        {error['product_name'] for error in results['errors']}
+        - {error['product_name'] for error in baseline.get('errors', [])}
+    )
+    regressions.extend(f"now misclassified: {product_name}" for product_name in sorted(newly_wrong))
+    return regressions
+
+
+if __name__ == '__main__':
+    run(output=sys.argv[1] if len(sys.argv) > 1 else None, baseline=sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,90 @@
+# apps/besty/besty/benchmarks/fuzzy_match.py
+#
+# Compares the trigram fuzzy-match index against difflib over the keyword
+# vocabulary:
+#
+#   bench --site <site> execute besty.benchmarks.fuzzy_match.run
+#   python -m besty.benchmarks.fuzzy_match
+
+import json
+import random
+import time
+from difflib import SequenceMatcher, get_close_matches
+
+from besty.keyword_index import TrigramIndex
+from besty.taxonomy import get_taxonomy
+
+# Misspellings seen in scraped names and shopper searches
+OBSERVED_MISSPELLINGS = [
+    'brocoli', 'brocolli', 'tomatos', 'potatos', 'avacado', 'bannana', 'bananna',
+    'zuchini', 'zucchinni', 'mozarella', 'parmesean', 'chedder', 'yoghurts', 'yougurt',
+    'cappucino', 'expresso', 'choclate', 'chocolat', 'sausges', 'saussage', 'bacn',
+    'spagetti', 'spaghetty', 'lasagne', 'macaroini', 'cerael', 'musli', 'granolla',
+    'strawberrys', 'blueberrys', 'rasberry', 'pinapple', 'mandarines', 'kumera',
+    'letuce', 'cabage', 'cucmber', 'capsicum', 'mushrooms', 'onoin', 'garlc',
+    'shampo', 'condtioner', 'toothpast', 'detergant', 'tissues', 'bisuits', 'crackes',
+    'lemonaid', 'kombutcha', 'whiskey', 'vodca', 'chiken', 'salmn', 'prawnz',
+]
+
+
+def misspelling_corpus(vocabulary, seed=13):
+    """Deterministic typos (drop, swap, double, substitute) of single-word keywords."""
+    rng = random.Random(seed)
+    corpus = list(OBSERVED_MISSPELLINGS)
+    for keyword in vocabulary:
+        if ' ' in keyword or len(keyword) < 4:
+            continue
+        i = rng.randrange(1, len(keyword) - 1)
+        corpus.append(keyword[:i] + keyword[i + 1:])
+        corpus.append(keyword[:i - 1] + keyword[i] + keyword[i - 1] + keyword[i + 1:])
+        corpus.append(keyword[:i] + keyword[i] + keyword[i:])
+        corpus.append(keyword[:i] + rng.choice('aeiou') + keyword[i + 1:])
+    return corpus
+
+
+def score(word, matches):
+    return SequenceMatcher(None, matches[0], word).ratio() if matches else 0.0
+
+
+def timed(lookup, words):
+    started = time.perf_counter()
+    results = [lookup(word) for word in words]
+    return results, time.perf_counter() - started
+
+
+def run(cutoff=0.8, shortlist=32):
+    vocabulary = list(get_taxonomy().keywords)
+    corpus = misspelling_corpus(vocabulary)
+
+    started = time.perf_counter()
+    index = TrigramIndex(vocabulary, shortlist=shortlist)
+    build_seconds = time.perf_counter() - started
+
+    expected, difflib_seconds = timed(lambda word: get_close_matches(word, vocabulary, n=1, cutoff=cutoff), corpus)
+    actual, index_seconds = timed(lambda word: index.close_matches(word, n=1, cutoff=cutoff), corpus)
+
+    # A disagreement only costs accuracy if the index's pick scores lower
+    # than difflib's; equal scores are ties broken differently
+    disagreements = [
+        {'word': word, 'difflib': e, 'index': a, 'score_delta': score(word, a) - score(word, e)}
+        for word, e, a in zip(corpus, expected, actual) if e != a
+    ]
+    results = {
+        'vocabulary': len(vocabulary),
+        'words': len(corpus),
+        'cutoff': cutoff,
+        'shortlist': shortlist,
+        'build_seconds': build_seconds,
+        'difflib_seconds': difflib_seconds,
+        'index_seconds': index_seconds,
+        'speedup': difflib_seconds / index_seconds if index_seconds else None,
+        'agreement': 1 - len(disagreements) / len(corpus),
+        'worse': sum(1 for d in disagreements if d['score_delta'] < 0),
+        'disagreements': disagreements[:20]
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    run()
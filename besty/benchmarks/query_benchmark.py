@@ -0,0 +1,255 @@
+# apps/besty/besty/benchmarks/query_benchmark.py
+#
+# EXPLAIN plans and latencies of the hot Product Item queries over a
+# generated catalog, without and with the Product Item index pack:
+#
+#   bench --site <site> execute besty.benchmarks.query_benchmark.run
+#   bench --site <site> execute besty.benchmarks.query_benchmark.run --kwargs "{'rows': 100000}"
+#   bench --site <site> execute besty.benchmarks.query_benchmark.run --kwargs "{'baseline': 'before.json'}"
+#
+# The catalog is written to a scratch copy of `tabProduct Item` that is
+# dropped afterwards, so the site's data is never touched. Results are
+# printed as JSON (and written to ``output`` when given). Queries that still
+# scan the whole table with the pack in place, and plans or latencies that
+# got worse against a ``baseline`` from an earlier run, are listed under
+# "regressions".
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import frappe
+
+from besty.benchmarks.classifier_benchmark import latency_summary
+from besty.besty.doctype.product_item.product_item import COMPOSITE_INDEXES, UNIQUE_KEY
+from besty.taxonomy import get_taxonomy
+
+SCRATCH_TABLE = '__besty_query_benchmark'
+SOURCE_SITES = ('woolworths', 'coles', 'aldi')
+SIZES = (('500', 'g'), ('1', 'kg'), ('250', 'g'), ('1', 'L'), ('2', 'L'), ('600', 'ml'), ('6', 'pack'), ('1', 'ea'))
+INSERT_CHUNK_SIZE = 5000
+LOOKUP_IDS = 100
+
+# The indexes this benchmark is about; the table's other indexes stay in both runs
+INDEX_PACK = [['last_updated'], ['productname'], *COMPOSITE_INDEXES]
+UNIQUE_INDEXES = [UNIQUE_KEY]
+
+# Allowed latency growth against a baseline before a query counts as a regression
+LATENCY_TOLERANCE = 0.5
+
+# name -> (query, parameters drawn for each execution)
+HOT_QUERIES = {
+    'ingest_lookup': (
+        "select name from `{table}` where source_site = %(site)s and product_id in %(product_ids)s",
+        lambda catalog, rng: {
+            'site': rng.choice(SOURCE_SITES),
+            'product_ids': tuple(str(rng.randrange(catalog['per_site'])) for i in range(LOOKUP_IDS))
+        }
+    ),
+    'recently_updated': (
+        "select name, productname, last_updated from `{table}` order by last_updated desc limit 20",
+        lambda catalog, rng: {}
+    ),
+    'category_by_unit_price': (
+        "select name, productname, unit_price from `{table}`"
+        " where category = %(category)s order by unit_price asc limit 20",
+        lambda catalog, rng: {'category': rng.choice(catalog['categories'])}
+    ),
+    'cheapest_in_category': (
+        "select name, normalized_unit_price from `{table}` where category = %(category)s"
+        " and normalized_unit = %(unit)s and normalized_unit_price > 0 order by normalized_unit_price asc limit 10",
+        lambda catalog, rng: {'category': rng.choice(catalog['categories']), 'unit': rng.choice(('kg', 'L', 'ea'))}
+    ),
+    'productname_lookup': (
+        "select name from `{table}` where productname = %(productname)s",
+        lambda catalog, rng: {'productname': product_name(catalog, rng.randrange(catalog['rows']))}
+    ),
+    'category_count': (
+        "select count(*) from `{table}` where category = %(category)s",
+        lambda catalog, rng: {'category': rng.choice(catalog['categories'])}
+    ),
+    'recently_updated_since': (
+        "select name from `{table}` where last_updated > %(since)s order by last_updated desc limit 500",
+        lambda catalog, rng: {'since': catalog['now'] - timedelta(hours=rng.randrange(1, 48))}
+    ),
+}
+
+
+def product_name(catalog, i):
+    keywords = catalog['keywords']
+    return f"{SOURCE_SITES[i % len(SOURCE_SITES)].title()} {keywords[i % len(keywords)]} {i // len(keywords)}"
+
+
+def build_catalog(rows, seed):
+    """Create the scratch table like `tabProduct Item` and fill it with ``rows`` seeded items."""
+    rng = random.Random(seed)
+    taxonomy = get_taxonomy()
+    categories = sorted(taxonomy.product_type_keywords)
+    catalog = {
+        'rows': rows,
+        'per_site': rows // len(SOURCE_SITES) + 1,
+        'categories': categories,
+        'keywords': [
+            keyword for category in categories for keyword in taxonomy.product_type_keywords[category]
+        ],
+        'category_of': {
+            keyword: category
+            for category in categories for keyword in taxonomy.product_type_keywords[category]
+        },
+        'now': datetime.now().replace(microsecond=0)
+    }
+
+    frappe.db.sql_ddl(f"drop table if exists `{SCRATCH_TABLE}`")
+    frappe.db.sql_ddl(f"create table `{SCRATCH_TABLE}` like `tabProduct Item`")
+    drop_pack()
+
+    fields = [
+        'name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus', 'idx', 'source_site', 'product_id',
+        'productname', 'category', 'size', 'unit_name', 'current_price', 'unit_price', 'normalized_unit',
+        'normalized_unit_price', 'last_updated', 'last_checked'
+    ]
+    units = {'g': ('kg', 1000), 'kg': ('kg', 1), 'ml': ('L', 1000), 'L': ('L', 1), 'ea': ('ea', 1), 'pack': ('ea', 1)}
+    for start in range(0, rows, INSERT_CHUNK_SIZE):
+        values = []
+        for i in range(start, min(start + INSERT_CHUNK_SIZE, rows)):
+            keyword = catalog['keywords'][i % len(catalog['keywords'])]
+            quantity, unit = SIZES[rng.randrange(len(SIZES))]
+            price = round(rng.uniform(0.5, 40), 2)
+            normalized_unit, factor = units[unit]
+            updated = catalog['now'] - timedelta(minutes=rng.randrange(60 * 24 * 90))
+            values.append((
+                i + 1, updated, updated, 'Administrator', 'Administrator', 0, 0,
+                SOURCE_SITES[i % len(SOURCE_SITES)], str(i // len(SOURCE_SITES)), product_name(catalog, i),
+                catalog['category_of'][keyword], f'{quantity}{unit}', unit, price, round(price / float(quantity), 4),
+                normalized_unit, round(price * factor / float(quantity), 4), updated, updated
+            ))
+        placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(values))
+        frappe.db.sql(f"""
+            insert into `{SCRATCH_TABLE}` ({', '.join(f'`{field}`' for field in fields)})
+            values {placeholders}
+        """, [value for row in values for value in row])
+        frappe.db.commit()
+
+    frappe.db.sql(f"analyze table `{SCRATCH_TABLE}`")
+    return catalog
+
+
+def table_indexes():
+    """``{index_name: (columns...)}`` for the scratch table."""
+    indexes = {}
+    for row in frappe.db.sql(f"show index from `{SCRATCH_TABLE}`", as_dict=True):
+        indexes.setdefault(row.Key_name, []).append((row.Seq_in_index, row.Column_name))
+    return {name: tuple(column for seq, column in sorted(columns)) for name, columns in indexes.items()}
+
+
+def drop_pack():
+    """Drop every pack index the copied table came with, to measure the table as it was before."""
+    pack = {tuple(fields) for fields in INDEX_PACK + UNIQUE_INDEXES}
+    for name, columns in table_indexes().items():
+        if name != 'PRIMARY' and columns in pack:
+            frappe.db.sql_ddl(f"alter table `{SCRATCH_TABLE}` drop index `{name}`")
+
+
+def add_pack():
+    existing = set(table_indexes().values())
+    for fields in INDEX_PACK + UNIQUE_INDEXES:
+        if tuple(fields) in existing:
+            continue
+        kind = 'unique index' if fields in UNIQUE_INDEXES else 'index'
+        frappe.db.sql_ddl(f"""
+            alter table `{SCRATCH_TABLE}`
+            add {kind} `{'_'.join(fields)}_bench` ({', '.join(f'`{field}`' for field in fields)})
+        """)
+    frappe.db.sql(f"analyze table `{SCRATCH_TABLE}`")
+
+
+def explain(query, params):
+    return [
+        {key: row.get(key) for key in ('table', 'type', 'possible_keys', 'key', 'key_len', 'rows', 'Extra')}
+        for row in frappe.db.sql(f"explain {query}", params, as_dict=True)
+    ]
+
+
+def measure(catalog, repeat, seed):
+    """Plan and latency of each hot query against the scratch table as it is now."""
+    results = {}
+    for query_name, (query, draw) in HOT_QUERIES.items():
+        rng = random.Random(f'{seed}-{query_name}')
+        query = query.format(table=SCRATCH_TABLE)
+        timings = []
+        for i in range(repeat):
+            params = draw(catalog, rng)
+            started = time.perf_counter()
+            frappe.db.sql(query, params)
+            timings.append(time.perf_counter() - started)
+        plan = explain(query, draw(catalog, rng))
+        results[query_name] = {
+            'plan': plan,
+            'full_scan': any(row['type'] == 'ALL' for row in plan),
+            'filesort': any('filesort' in (row['Extra'] or '') for row in plan),
+            'latency': latency_summary(timings)
+        }
+    return results
+
+
+def run(rows=500000, repeat=50, seed=0, output=None, baseline=None):
+    """
+    Benchmark the hot queries over a ``rows``-item generated catalog, first
+    without the index pack and then with it. Each query runs ``repeat`` times
+    with fresh parameters; ``seed`` makes the catalog and parameters repeatable.
+    """
+    started = time.perf_counter()
+    try:
+        catalog = build_catalog(rows, seed)
+        build_seconds = time.perf_counter() - started
+        before = measure(catalog, repeat, seed)
+        add_pack()
+        after = measure(catalog, repeat, seed)
+    finally:
+        frappe.db.sql_ddl(f"drop table if exists `{SCRATCH_TABLE}`")
+
+    results = {
+        'catalog': {'rows': rows, 'seed': seed, 'repeat': repeat, 'build_seconds': build_seconds},
+        'indexes': INDEX_PACK + UNIQUE_INDEXES,
+        'before': before,
+        'after': after,
+        'speedup': {
+            query_name: (
+                before[query_name]['latency']['p50_ms'] / after[query_name]['latency']['p50_ms']
+                if after[query_name]['latency']['p50_ms'] else None
+            )
+            for query_name in HOT_QUERIES
+        },
+        'regressions': [f"{query_name} scans the whole table" for query_name in HOT_QUERIES
+            if after[query_name]['full_scan']]
+    }
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            results['regressions'].extend(compare(json.load(f), results))
+
+    text = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return results
+
+
+def compare(baseline, results):
+    """Plans that lost their index or sort, and latencies beyond the tolerance, as readable strings."""
+    regressions = []
+    for query_name, after in results['after'].items():
+        before = baseline.get('after', {}).get(query_name)
+        if not before:
+            continue
+        before_keys = [row['key'] for row in before['plan']]
+        after_keys = [row['key'] for row in after['plan']]
+        if before_keys != after_keys:
+            regressions.append(f"{query_name} plan uses {after_keys} instead of {before_keys}")
+        if after['filesort'] and not before['filesort']:
+            regressions.append(f"{query_name} now sorts with filesort")
+        before_ms, after_ms = before['latency']['p50_ms'], after['latency']['p50_ms']
+        if before_ms and after_ms and after_ms > before_ms * (1 + LATENCY_TOLERANCE):
+            regressions.append(f"{query_name} p50 {before_ms:.2f} -> {after_ms:.2f} ms")
+    return regressions
@@ -0,0 +1,98 @@
+# apps/besty/besty/benchmarks/search_benchmark.py
+#
+# Latency of ranked product search over the site's search index (the p99
+# target is set for a 500k-item catalog):
+#
+#   bench --site <site> execute besty.benchmarks.search_benchmark.run
+#   bench --site <site> execute besty.benchmarks.search_benchmark.run --kwargs "{'repeat': 5}"
+#
+# Queries are taxonomy keywords, their prefixes and misspellings, and keyword
+# pairs, each run unfiltered and with a shop or category filter. Results are
+# printed as JSON (and written to ``output`` when given); query kinds whose
+# p99 misses P99_TARGET_MS are listed under "regressions".
+
+import json
+import random
+import time
+
+import frappe
+
+from besty.benchmarks.classifier_benchmark import latency_summary
+from besty.benchmarks.fuzzy_match import misspelling_corpus
+from besty.search_index import load_vocabulary_index, search
+from besty.taxonomy import get_taxonomy
+
+P99_TARGET_MS = 50
+QUERIES_PER_KIND = 200
+
+
+def query_corpus(seed=0, size=QUERIES_PER_KIND):
+    """``{kind: [query]}`` drawn from the taxonomy keywords."""
+    rng = random.Random(seed)
+    keywords = list(get_taxonomy().keywords)
+    single = [keyword for keyword in keywords if ' ' not in keyword and len(keyword) >= 4]
+    return {
+        'keyword': rng.sample(keywords, min(size, len(keywords))),
+        'prefix': [keyword[:rng.randrange(2, len(keyword))] for keyword in rng.sample(single, min(size, len(single)))],
+        'misspelling': rng.sample(misspelling_corpus(single), min(size, len(single))),
+        'two_words': [' '.join(rng.sample(single, 2)) for i in range(size)],
+    }
+
+
+def filter_corpus():
+    """Unfiltered plus the busiest shop and category filters."""
+    filters = [{}]
+    for field in ('source_site', 'category'):
+        value = frappe.db.sql(f"""
+            select `{field}` from `tabProduct Item`
+            where ifnull(`{field}`, '') != ''
+            group by `{field}` order by count(*) desc limit 1
+        """)
+        if value:
+            filters.append({field: value[0][0]})
+    return filters
+
+
+def run(repeat=3, seed=0, output=None):
+    """
+    Time ``search`` for every query kind and filter, ``repeat`` passes each,
+    after loading the vocabulary index the way a warm worker has it.
+    """
+    started = time.perf_counter()
+    vocabulary = load_vocabulary_index()
+    vocabulary_seconds = time.perf_counter() - started
+
+    filters = filter_corpus()
+    by_kind = {}
+    everything = []
+    for kind, queries in query_corpus(seed).items():
+        timings = []
+        for i in range(repeat):
+            for query in queries:
+                for query_filters in filters:
+                    call_started = time.perf_counter()
+                    search(query, query_filters)
+                    timings.append(time.perf_counter() - call_started)
+        by_kind[kind] = latency_summary(timings)
+        everything.extend(timings)
+
+    results = {
+        'products': frappe.db.count('Product Item'),
+        'vocabulary': {'tokens': len(vocabulary.vocabulary), 'load_seconds': vocabulary_seconds},
+        'filters': filters,
+        'repeat': repeat,
+        'p99_target_ms': P99_TARGET_MS,
+        'latency': latency_summary(everything),
+        'latency_by_kind': by_kind,
+        'regressions': [
+            f"{kind} p99 {latency['p99_ms']:.1f} ms over the {P99_TARGET_MS} ms target"
+            for kind, latency in by_kind.items() if latency['p99_ms'] and latency['p99_ms'] > P99_TARGET_MS
+        ]
+    }
+
+    text = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return results
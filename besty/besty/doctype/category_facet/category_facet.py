@@ -0,0 +1,15 @@
+# Copyright (c) 2026, Benjamen Walsh and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CategoryFacet(Document):
+	pass
+
+
+def on_doctype_update():
+	# Facet queries list one level for one shop (blank for all), or one category across shops
+	frappe.db.add_index("Category Facet", ["level", "source_site", "category_name"])
+	frappe.db.add_index("Category Facet", ["category_name", "level"])
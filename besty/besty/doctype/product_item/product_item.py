@@ -1,9 +1,47 @@
 # Copyright (c) 2024, Benjamen Walsh and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+from besty.unit_normalization import normalized_unit_price
+
+# Scraper upserts look items up by shop and the shop's own product id
+UNIQUE_KEY = ["source_site", "product_id"]
+UNIQUE_KEY_NAME = "unique_source_site_product_id"
+
+# Category listings sorted by unit price, and cheapest-in-category range scans;
+# single-column indexes (last_updated, productname, ...) are search_index fields
+COMPOSITE_INDEXES = [
+	["category", "unit_price"],
+	["category", "normalized_unit", "normalized_unit_price"],
+]
+
 
 class ProductItem(Document):
-	pass
+	def validate(self):
+		self.set_normalized_unit_price()
+
+	def set_normalized_unit_price(self):
+		self.normalized_unit, self.normalized_unit_price = normalized_unit_price(
+			self.current_price, self.size, self.unit_name, self.original_unit_quantity
+		)
+
+
+def on_doctype_update():
+	for fields in COMPOSITE_INDEXES:
+		frappe.db.add_index("Product Item", fields)
+	# Existing duplicates are merged by the add_product_item_indexes patch, which then adds the key
+	if not frappe.db.has_index("tabProduct Item", UNIQUE_KEY_NAME) and not has_duplicate_products():
+		frappe.db.add_unique("Product Item", UNIQUE_KEY, constraint_name=UNIQUE_KEY_NAME)
+
+
+def has_duplicate_products():
+	return bool(frappe.db.sql("""
+		select 1
+		from `tabProduct Item`
+		where product_id is not null and product_id != ''
+		group by source_site, product_id
+		having count(*) > 1
+		limit 1
+	"""))
@@ -0,0 +1,17 @@
+# Copyright (c) 2026, Benjamen Walsh and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from besty.price_history import price_name
+
+
+class ProductPrice(Document):
+	def autoname(self):
+		self.name = price_name(self.product, self.price, self.observed_at)
+
+
+def on_doctype_update():
+	# Every history query is one product over a time range
+	frappe.db.add_index("Product Price", ["product", "observed_at"])
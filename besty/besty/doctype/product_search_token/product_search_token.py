@@ -0,0 +1,14 @@
+# Copyright (c) 2026, Benjamen Walsh and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class ProductSearchToken(Document):
+	pass
+
+
+def on_doctype_update():
+	# Token lookups (exact and prefix) resolve straight to products
+	frappe.db.add_index("Product Search Token", ["token", "product"])
@@ -0,0 +1,374 @@
+# apps/besty/besty/category_facets.py
+#
+# Category Facet rows hold, per (category, level, shop), the item count and
+# the min/median/max normalized unit price, plus one row per category with a
+# blank shop for all shops together. Counts and the min/max bounds are
+# adjusted in the same transaction as the Product Item writes; a facet is only
+# marked stale, and recomputed by a deduplicated background job, when a
+# removed price was one of its bounds. The medians and each facet's most
+# common unit catch up in the daily full refresh.
+
+import hashlib
+from collections import Counter
+from statistics import median
+
+import frappe
+from frappe.utils import cint, flt, now_datetime
+
+ALL_SITES = ''
+REFRESH_BATCH_SIZE = 100
+
+
+def facet_name(category_name, level, source_site):
+    """Deterministic name, so count adjustments can upsert on the primary key."""
+    return hashlib.sha1(f'{category_name}|{level}|{source_site}'.encode('utf-8')).hexdigest()[:20]
+
+
+def facet_keys(source_site, category_names):
+    """``(category_name, level, source_site)`` of every facet an item in these categories counts in."""
+    return {
+        (category_name, level, site)
+        for level, category_name in enumerate(category_names, start=1)
+        for site in {source_site or ALL_SITES, ALL_SITES}
+    }
+
+
+def facet_deltas(changes):
+    """
+    Count changes for ``[(source_site, old_category_names, new_category_names, ...)]``
+    as ``{(category_name, level, source_site): delta}``, covering both the shop
+    and the all-shops facet, plus the top category of each product type.
+    """
+    deltas = Counter()
+    parents = {}
+    for source_site, old_names, new_names, *prices in changes:
+        for names, sign in ((old_names, -1), (new_names, 1)):
+            for category_name, level, site in facet_keys(source_site, names):
+                deltas[(category_name, level, site)] += sign
+                if level > 1:
+                    parents.setdefault((category_name, level, site), names[0])
+    return {key: delta for key, delta in deltas.items() if delta}, parents
+
+
+def price_moves(changes):
+    """
+    Unit prices leaving and joining facets for
+    ``[(source_site, old_category_names, new_category_names, old_price, new_price)]``,
+    where a price is ``(normalized_unit, normalized_unit_price)``, as
+    ``{(category_name, level, source_site): (removed_prices, added_prices)}``.
+    An item that stays in a facet at the same price moves nothing there.
+    """
+    moves = {}
+    for source_site, old_names, new_names, old_price, new_price in changes:
+        old_price = old_price if old_price and old_price[0] and old_price[1] else None
+        new_price = new_price if new_price and new_price[0] and new_price[1] else None
+        old_keys = facet_keys(source_site, old_names)
+        new_keys = facet_keys(source_site, new_names)
+        for key in old_keys | new_keys:
+            removed = old_price if key in old_keys else None
+            added = new_price if key in new_keys else None
+            if removed == added:
+                continue
+            removed_prices, added_prices = moves.setdefault(key, ([], []))
+            if removed:
+                removed_prices.append((removed[0], flt(removed[1], 4)))
+            if added:
+                added_prices.append((added[0], flt(added[1], 4)))
+    return moves
+
+
+def bound_updates(facet, removed, added):
+    """
+    How one facet's price bounds change, given its stored ``normalized_unit``,
+    ``min_unit_price`` and ``max_unit_price``: None when a removed price was a
+    bound (or the unit is ambiguous) so only a recompute can tell, otherwise
+    ``(unit, lowest_added, highest_added)``, with no prices when nothing in the
+    facet's unit was added.
+    """
+    unit = facet.normalized_unit
+    if not unit:
+        units = {price_unit for price_unit, price in added}
+        if len(units) > 1:
+            return None
+        unit = units.pop() if units else None
+
+    for price_unit, price in removed:
+        if price_unit == unit and (
+                facet.min_unit_price is None or facet.max_unit_price is None
+                or price <= flt(facet.min_unit_price, 4) or price >= flt(facet.max_unit_price, 4)):
+            return None
+
+    prices = [price for price_unit, price in added if price_unit == unit]
+    return unit, (min(prices) if prices else None), (max(prices) if prices else None)
+
+
+def adjust_facet_prices(moves):
+    """
+    Widen facet min/max bounds for added prices in place, and queue facets for
+    a recompute only when a removed price was their min or max. Facets without
+    a row yet, or already stale, are left to the refresh job.
+    """
+    if not moves:
+        return
+    facets = {
+        facet.name: facet
+        for facet in frappe.get_all('Category Facet',
+            filters={'name': ('in', [facet_name(*key) for key in moves]), 'stale': 0},
+            fields=['name', 'normalized_unit', 'min_unit_price', 'max_unit_price'],
+            limit_page_length=0
+        )
+    }
+
+    stale = []
+    bounds = []
+    for key, (removed, added) in moves.items():
+        facet = facets.get(facet_name(*key))
+        if not facet:
+            continue
+        update = bound_updates(facet, removed, added)
+        if update is None:
+            stale.append(facet.name)
+        elif update[1] is not None:
+            bounds.append((facet.name, *update))
+
+    if bounds:
+        # The unit guard keeps a bound from widening in another unit if a refresh changed it meanwhile
+        frappe.db.sql(f"""
+            update `tabCategory Facet` facet
+            join ({' union all '.join(['select %s name, %s unit, %s low, %s high'] * len(bounds))}) added
+                on facet.name = added.name
+            set facet.min_unit_price = least(coalesce(facet.min_unit_price, added.low), added.low),
+                facet.max_unit_price = greatest(coalesce(facet.max_unit_price, added.high), added.high),
+                facet.normalized_unit = added.unit
+            where facet.stale = 0 and ifnull(facet.normalized_unit, added.unit) = added.unit
+        """, [value for row in bounds for value in row])
+    if stale:
+        frappe.db.set_value('Category Facet', {'name': ('in', stale)}, 'stale', 1, update_modified=False)
+        enqueue_facet_refresh()
+
+
+def adjust_facet_counts(changes):
+    """
+    Apply classification changes, as
+    ``[(source_site, old_category_names, new_category_names, old_price, new_price)]``,
+    to facet counts and price bounds.
+    """
+    deltas, parents = facet_deltas(changes)
+    if not deltas:
+        return
+
+    now = now_datetime()
+    user = frappe.session.user
+    values = []
+    for (category_name, level, source_site), delta in deltas.items():
+        values.extend([
+            facet_name(category_name, level, source_site), now, now, user, user,
+            category_name, level, source_site, parents.get((category_name, level, source_site)), delta
+        ])
+    # A facet missing its row (never built) may start negative; new rows are stale so the refresh recounts them
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1)'] * len(deltas))
+    frappe.db.sql(f"""
+        insert into `tabCategory Facet`
+            (name, creation, modified, owner, modified_by, category_name, level, source_site,
+                parent_category, item_count, stale)
+        values {placeholders}
+        on duplicate key update
+            item_count = greatest(item_count + values(item_count), 0),
+            modified = values(modified)
+    """, values)
+    emptied = [facet_name(*key) for key, delta in deltas.items() if delta < 0]
+    if emptied:
+        # Empty facets are deleted by the refresh
+        frappe.db.set_value('Category Facet', {'name': ('in', emptied), 'item_count': 0}, 'stale', 1,
+            update_modified=False)
+    enqueue_facet_refresh()
+    adjust_facet_prices(price_moves(changes))
+
+
+def remove_product_facets(doc, method=None):
+    """Product Item on_trash hook: take the item out of its categories' counts and prices."""
+    category_names = [row.category_name for row in doc.get('product_categories')]
+    if category_names:
+        price = (doc.normalized_unit, doc.normalized_unit_price)
+        adjust_facet_counts([(doc.source_site, category_names, [], price, None)])
+
+
+def update_price_facets(doc, method=None):
+    """Product Item on_update hook: move the item's unit price within its categories' price bounds."""
+    before = doc.get_doc_before_save()
+    # A new item's categories are written with its price by the classifier
+    if not before:
+        return
+    old_price = (before.normalized_unit, flt(before.normalized_unit_price, 4))
+    new_price = (doc.normalized_unit, flt(doc.normalized_unit_price, 4))
+    if old_price != new_price:
+        reprice_facets({doc.name: (old_price, new_price)})
+
+
+def reprice_facets(prices):
+    """
+    Apply unit price changes of Product Items, as ``{name: (old_price, new_price)}``
+    with ``(normalized_unit, normalized_unit_price)`` prices, to the price
+    bounds of their categories' facets.
+    """
+    prices = {str(name): price for name, price in prices.items()}
+    if not prices:
+        return
+    categories = {}
+    for parent, source_site, category_name in frappe.db.sql("""
+        select category.parent, item.source_site, category.category_name
+        from `tabProduct Category` category
+        join `tabProduct Item` item on item.name = category.parent
+        where category.parenttype = 'Product Item' and category.parentfield = 'product_categories'
+            and category.parent in %(names)s
+        order by category.parent, category.idx
+    """, {'names': tuple(prices)}):
+        categories.setdefault(str(parent), (source_site, []))[1].append(category_name)
+
+    adjust_facet_prices(price_moves([
+        (source_site, category_names, category_names, *prices[name])
+        for name, (source_site, category_names) in categories.items()
+    ]))
+
+
+def mark_all_facets_stale():
+    """Scheduled daily: recompute every facet, catching up medians and most common units."""
+    frappe.db.set_value('Category Facet', {'stale': 0}, 'stale', 1, update_modified=False)
+    enqueue_facet_refresh()
+
+
+def mark_facets_stale(names):
+    """Queue the facets of these Product Items for a price refresh."""
+    names = list(names)
+    if not names:
+        return
+    frappe.db.sql("""
+        update `tabCategory Facet` facet
+        join (
+            select distinct category.category_name, category.idx, item.source_site
+            from `tabProduct Category` category
+            join `tabProduct Item` item on item.name = category.parent
+            where category.parenttype = 'Product Item' and category.parentfield = 'product_categories'
+                and category.parent in %(names)s
+        ) changed on facet.category_name = changed.category_name and facet.level = changed.idx
+            and facet.source_site in (changed.source_site, %(all_sites)s)
+        set facet.stale = 1
+    """, {'names': tuple(names), 'all_sites': ALL_SITES})
+    enqueue_facet_refresh()
+
+
+def enqueue_facet_refresh():
+    frappe.enqueue(
+        'besty.category_facets.refresh_stale_facets',
+        queue='short',
+        job_id='besty_refresh_category_facets',
+        deduplicate=True,
+        enqueue_after_commit=True
+    )
+
+
+def facet_aggregates(category_name, level, source_site):
+    """Exact item count, most common unit and min/median/max price in it for one facet."""
+    conditions = ''
+    if source_site:
+        conditions = 'and item.source_site = %(source_site)s'
+    rows = frappe.db.sql(f"""
+        select item.normalized_unit, item.normalized_unit_price
+        from `tabProduct Category` category
+        join `tabProduct Item` item on item.name = category.parent
+        where category.parenttype = 'Product Item' and category.parentfield = 'product_categories'
+            and category.category_name = %(category_name)s and category.idx = %(level)s {conditions}
+    """, {'category_name': category_name, 'level': level, 'source_site': source_site})
+
+    units = Counter(unit for unit, price in rows if unit and price)
+    unit = units.most_common(1)[0][0] if units else None
+    prices = sorted(price for row_unit, price in rows if row_unit == unit and price) if unit else []
+    return {
+        'item_count': len(rows),
+        'normalized_unit': unit,
+        'min_unit_price': prices[0] if prices else None,
+        'median_unit_price': median(prices) if prices else None,
+        'max_unit_price': prices[-1] if prices else None
+    }
+
+
+def refresh_stale_facets(batch_size=REFRESH_BATCH_SIZE):
+    """
+    Background job: recompute counts and prices of stale facets a batch at a
+    time. Facets are claimed before they are read, so ones marked stale again
+    meanwhile are picked up by a later batch of the same run.
+    """
+    while True:
+        facets = frappe.get_all('Category Facet',
+            filters={'stale': 1},
+            fields=['name', 'category_name', 'level', 'source_site'],
+            limit_page_length=batch_size
+        )
+        if not facets:
+            break
+
+        frappe.db.set_value('Category Facet', {'name': ('in', [facet.name for facet in facets])}, 'stale', 0,
+            update_modified=False)
+        updates = {}
+        empty = []
+        for facet in facets:
+            aggregates = facet_aggregates(facet.category_name, cint(facet.level), facet.source_site)
+            if aggregates['item_count']:
+                updates[facet.name] = aggregates
+            else:
+                empty.append(facet.name)
+
+        if updates:
+            frappe.db.bulk_update('Category Facet', updates)
+        if empty:
+            frappe.db.delete('Category Facet', {'name': ('in', empty)})
+        frappe.db.commit()
+
+
+def rebuild_category_facets():
+    """Enqueue a full rebuild of the Category Facet table."""
+    frappe.enqueue(
+        'besty.category_facets.build_category_facets',
+        queue='long',
+        timeout=60 * 60,
+        job_id='besty_build_category_facets',
+        deduplicate=True
+    )
+
+
+def build_category_facets():
+    """
+    Background job: recreate every facet from Product Category with one
+    grouped count, then fill in prices through refresh_stale_facets.
+    """
+    rows = frappe.db.sql("""
+        select category.category_name, category.idx, item.source_site, top.category_name, count(*)
+        from `tabProduct Category` category
+        join `tabProduct Item` item on item.name = category.parent
+        left join `tabProduct Category` top on top.parent = category.parent
+            and top.parenttype = 'Product Item' and top.parentfield = 'product_categories' and top.idx = 1
+        where category.parenttype = 'Product Item' and category.parentfield = 'product_categories'
+        group by category.category_name, category.idx, item.source_site, top.category_name
+    """)
+
+    counts = Counter()
+    parents = {}
+    for category_name, level, source_site, parent_category, count in rows:
+        for site in {source_site or ALL_SITES, ALL_SITES}:
+            counts[(category_name, level, site)] += count
+            if level > 1 and parent_category:
+                parents.setdefault((category_name, level, site), parent_category)
+
+    now = now_datetime()
+    user = frappe.session.user
+    frappe.db.delete('Category Facet')
+    frappe.db.bulk_insert('Category Facet',
+        ['name', 'creation', 'modified', 'owner', 'modified_by', 'category_name', 'level', 'source_site',
+            'parent_category', 'item_count', 'stale'],
+        [
+            [facet_name(*key), now, now, user, user, *key, parents.get(key), count, 1]
+            for key, count in counts.items()
+        ]
+    )
+    frappe.db.commit()
+    refresh_stale_facets()
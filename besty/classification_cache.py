@@ -0,0 +1,81 @@
+# apps/besty/besty/classification_cache.py
+
+import threading
+from collections import OrderedDict
+
+import frappe
+
+
+class ClassificationCache:
+    """
+    Bounded LRU cache for classification results.
+
+    Entries are scoped by ``namespace``, which callers derive from the
+    classifier version, so a taxonomy, model or threshold change never serves
+    stale answers. With ``shared=True`` misses fall through to the site cache
+    (Redis), letting every worker reuse results computed by the others.
+    """
+
+    def __init__(self, namespace, maxsize=10000, shared=False, shared_ttl=7 * 24 * 60 * 60):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def shared_key(self, key):
+        return f'besty_classification|{self.namespace}|{key}'
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None on a miss."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.shared:
+            value = frappe.cache().get_value(self.shared_key(key))
+            if value is not None:
+                self.shared_hits += 1
+                self._store(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.shared:
+            frappe.cache().set_value(self.shared_key(key), value, expires_in_sec=self.shared_ttl)
+
+    def _store(self, key, value):
+        if not self.maxsize:
+            return
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Empty the local cache; shared entries age out through their TTL."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0
+        }
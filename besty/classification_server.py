@@ -0,0 +1,274 @@
+# apps/besty/besty/classification_server.py
+#
+# One process hosting the classifier for every worker on the box:
+#
+#   bench --site <site> classifier-server [--socket-path /path/to/socket]
+#
+# Workers send product names over a Unix socket (site config
+# ``besty_classifier_socket``). Requests that arrive within BATCH_WINDOW of each
+# other are classified together with classify_many, so concurrent inserts share
+# one embedding call. When the socket is not configured or the server is down,
+# callers classify in-process as before.
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from besty.classification_stats import stats
+
+# Seconds to wait for more requests once one arrives, and the cap per batch
+BATCH_WINDOW = 0.005
+MAX_BATCH_NAMES = 512
+
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+DEFAULT_TIMEOUT = 5.0
+
+# How long a worker keeps classifying in-process after failing to reach the server
+RETRY_INTERVAL = 30
+
+HEADER = struct.Struct('!I')
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def receive_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError('Connection closed mid-message')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def receive_message(sock):
+    """The next length-prefixed JSON message, or None when the peer closed cleanly."""
+    header = sock.recv(HEADER.size, socket.MSG_WAITALL)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise ConnectionError('Connection closed mid-header')
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f'Message of {size} bytes is too large')
+    return json.loads(receive_exactly(sock, size))
+
+
+class PendingRequest:
+    """Names from one client request, and the event its handler waits on."""
+
+    def __init__(self, names):
+        self.names = names
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects requests from the connection threads and classifies them in
+    batches on a single thread.
+
+    ``classify`` receives a flat list of names and returns results in the same
+    order. It always runs on the thread that calls ``run``, so a Frappe site
+    context set up there is available to it.
+    """
+
+    def __init__(self, classify, window=BATCH_WINDOW, max_names=MAX_BATCH_NAMES):
+        self.classify = classify
+        self.window = window
+        self.max_names = max_names
+        self.requests = queue.Queue()
+        self.stopped = threading.Event()
+
+    def submit(self, names, timeout=None):
+        request = PendingRequest(names)
+        self.requests.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError('Classification timed out')
+        if request.error:
+            raise request.error
+        return request.results
+
+    def next_batch(self):
+        """Block for one request, then take whatever else arrives within the window."""
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        size = len(batch[0].names)
+        deadline = time.monotonic() + self.window
+        while size < self.max_names:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.names)
+        return batch
+
+    def run_batch(self, batch):
+        names = [name for request in batch for name in request.names]
+        try:
+            results = self.classify(names)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+
+        stats.count('server_batches')
+        stats.count('server_requests', len(batch))
+        offset = 0
+        for request in batch:
+            request.results = results[offset:offset + len(request.names)]
+            offset += len(request.names)
+            request.done.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            batch = self.next_batch()
+            if batch:
+                self.run_batch(batch)
+
+
+class ClassificationRequestHandler(socketserver.BaseRequestHandler):
+    """Answers ``{'names': [...]}`` with ``{'results': [...]}`` until the client disconnects."""
+
+    def handle(self):
+        while True:
+            try:
+                message = receive_message(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if message is None:
+                return
+
+            try:
+                names = [str(name or '') for name in message['names']]
+                response = {'results': self.server.batcher.submit(names, timeout=self.server.request_timeout)}
+            except Exception as e:
+                response = {'error': f'{type(e).__name__}: {e}'}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class ClassificationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, batcher, request_timeout=60):
+        self.batcher = batcher
+        self.request_timeout = request_timeout
+        super().__init__(socket_path, ClassificationRequestHandler)
+
+
+def get_socket_path():
+    return frappe.conf.get('besty_classifier_socket')
+
+
+def serve(socket_path=None):
+    """
+    Host the site's classifier on a Unix socket until interrupted. Must run
+    inside a site context; batches are classified on the calling thread.
+    """
+    from besty.frappe_product_classifier import get_classifier
+
+    socket_path = socket_path or get_socket_path()
+    if not socket_path:
+        frappe.throw('Set besty_classifier_socket in site config or pass a socket path')
+    if os.path.exists(socket_path):
+        # Left behind by a server that did not shut down cleanly
+        os.unlink(socket_path)
+
+    # Build (and warm) the classifier before accepting connections
+    get_classifier().classify_many(['warmup'])
+
+    def classify(names):
+        results = get_classifier().classify_many(names)
+        stats.flush()
+        return results
+
+    batcher = MicroBatcher(classify)
+    server = ClassificationServer(socket_path, batcher)
+    os.chmod(socket_path, 0o660)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f'Classifier listening on {socket_path}')
+    try:
+        batcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.stopped.set()
+        server.shutdown()
+        server.server_close()
+        os.unlink(socket_path)
+        stats.flush(force=True)
+
+
+# Until when this worker skips the server after a failed attempt
+_unavailable_until = 0.0
+_local = threading.local()
+
+
+def get_connection(socket_path, timeout):
+    """A per-thread connection to the server, reused across calls."""
+    connection = getattr(_local, 'connection', None)
+    if connection is None or _local.socket_path != socket_path:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        _local.connection, _local.socket_path = connection, socket_path
+    return connection
+
+
+def close_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        connection.close()
+
+
+def classify_remote(names):
+    """
+    Results for ``names`` from the classification server, or None when no
+    server is configured or it cannot be reached, so the caller falls back to
+    classifying in-process.
+    """
+    global _unavailable_until
+    socket_path = get_socket_path()
+    if not socket_path or time.monotonic() < _unavailable_until:
+        return None
+
+    timeout = flt(frappe.conf.get('besty_classifier_socket_timeout')) or DEFAULT_TIMEOUT
+    try:
+        connection = get_connection(socket_path, timeout)
+        send_message(connection, {'names': list(names)})
+        response = receive_message(connection)
+        if not response or 'error' in response:
+            raise ConnectionError((response or {}).get('error', 'No response'))
+        return response['results']
+    except (OSError, ValueError) as e:
+        close_connection()
+        _unavailable_until = time.monotonic() + cint(frappe.conf.get('besty_classifier_retry_interval') or RETRY_INTERVAL)
+        stats.count('server_fallbacks')
+        frappe.logger('besty.classifier').warning(f'Classification server unavailable, classifying in-process: {e}')
+        return None
@@ -0,0 +1,162 @@
+# apps/besty/besty/classification_stats.py
+
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import frappe
+
+REDIS_KEY = 'besty_classifier_stats'
+FLUSH_INTERVAL = 30
+
+
+class ClassificationStats:
+    """
+    Per-process timings and counters for the classification pipeline.
+
+    Each stage keeps a call count, total and maximum seconds; ``match_types``
+    is the histogram of results by match type. ``flush`` adds the totals
+    gathered since the last flush to a site-wide Redis hash, so the stats
+    endpoint can report every worker together.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.stages = {}
+        self.counters = Counter()
+        self.match_types = Counter()
+        self._pending_stages = {}
+        self._pending_counters = Counter()
+        self._pending_match_types = Counter()
+        # Per-call durations by stage, only kept while a benchmark asks for them
+        self.samples = None
+
+    def collect_samples(self, enabled=True):
+        with self._lock:
+            self.samples = {} if enabled else None
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            for stages in (self.stages, self._pending_stages):
+                entry = stages.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+            if self.samples is not None:
+                self.samples.setdefault(stage, []).append(seconds)
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] += n
+            self._pending_counters[counter] += n
+
+    def record_match(self, match_type):
+        with self._lock:
+            self.match_types[match_type] += 1
+            self._pending_match_types[match_type] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return format_stats(
+                {stage: entry[:2] for stage, entry in self.stages.items()},
+                dict(self.counters),
+                dict(self.match_types),
+                {stage: entry[2] for stage, entry in self.stages.items()}
+            )
+
+    def flush(self, force=False):
+        """Add pending totals to the site-wide hash, at most every FLUSH_INTERVAL seconds."""
+        if not force and time.monotonic() - self.last_flush < FLUSH_INTERVAL:
+            return
+
+        with self._lock:
+            stages, self._pending_stages = self._pending_stages, {}
+            counters, self._pending_counters = self._pending_counters, Counter()
+            match_types, self._pending_match_types = self._pending_match_types, Counter()
+            self.last_flush = time.monotonic()
+        if not (stages or counters or match_types):
+            return
+
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        key = cache.make_key(REDIS_KEY)
+        for stage, (calls, seconds, max_seconds) in stages.items():
+            pipe.hincrby(key, f'stage:{stage}:count', calls)
+            pipe.hincrbyfloat(key, f'stage:{stage}:seconds', seconds)
+        for counter, n in counters.items():
+            pipe.hincrby(key, f'counter:{counter}', n)
+        for match_type, n in match_types.items():
+            pipe.hincrby(key, f'match:{match_type}', n)
+        pipe.execute()
+
+        if frappe.conf.get('besty_classifier_stats_log'):
+            frappe.logger('besty.classifier').info(json.dumps({
+                'stages': {stage: {'count': entry[0], 'seconds': entry[1]} for stage, entry in stages.items()},
+                'counters': counters,
+                'match_types': match_types
+            }))
+
+
+def format_stats(stages, counters, match_types, max_seconds=None):
+    """Shape raw ``{stage: [count, seconds]}`` totals and counters for the stats endpoint."""
+    names = counters.get('names', 0)
+    return {
+        'stages': {
+            stage: {
+                'count': count,
+                'total_seconds': seconds,
+                'mean_ms': 1000 * seconds / count if count else 0.0,
+                **({'max_ms': 1000 * max_seconds[stage]} if max_seconds else {})
+            }
+            for stage, (count, seconds) in sorted(stages.items())
+        },
+        'counters': counters,
+        'match_types': match_types,
+        'match_fractions': {
+            match_type: n / sum(match_types.values()) for match_type, n in match_types.items()
+        },
+        # Words sent to the embedding model per product name classified
+        'semantic_words_per_name': counters.get('semantic_words', 0) / names if names else 0.0
+    }
+
+
+def get_site_stats():
+    """Totals flushed by every worker of the site since the last reset."""
+    stages = {}
+    counters = {}
+    match_types = {}
+    cache = frappe.cache()
+    # RedisWrapper.hgetall unpickles values, but these are raw HINCRBY counters
+    for field, value in (cache.execute_command('HGETALL', cache.make_key(REDIS_KEY)) or {}).items():
+        kind, _, name = (field.decode() if isinstance(field, bytes) else field).partition(':')
+        value = float(value)
+        if kind == 'stage':
+            stage, _, measure = name.rpartition(':')
+            entry = stages.setdefault(stage, [0, 0.0])
+            if measure == 'count':
+                entry[0] = int(value)
+            else:
+                entry[1] = value
+        elif kind == 'counter':
+            counters[name] = int(value)
+        elif kind == 'match':
+            match_types[name] = int(value)
+    return format_stats(stages, counters, match_types)
+
+
+def reset_site_stats():
+    frappe.cache().delete_value(REDIS_KEY)
+
+
+stats = ClassificationStats()
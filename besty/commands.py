@@ -0,0 +1,24 @@
+# apps/besty/besty/commands.py
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command('classifier-server')
+@click.option('--socket-path', help='Unix socket to listen on (default: besty_classifier_socket from site config)')
+@pass_context
+def classifier_server(context, socket_path=None):
+    """Host the product classifier for every worker of the site on a Unix socket"""
+    from besty.classification_server import serve
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        serve(socket_path)
+    finally:
+        frappe.destroy()
+
+
+commands = [classifier_server]
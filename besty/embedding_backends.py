@@ -0,0 +1,91 @@
+# apps/besty/besty/embedding_backends.py
+#
+# Ways of running the sentence-transformers model on CPU-only workers:
+#
+#   torch  full-precision PyTorch (the reference)
+#   int8   PyTorch with Linear layers dynamically quantized to int8
+#   onnx   ONNX Runtime through sentence-transformers' onnx backend
+#          (needs sentence-transformers>=3.2 and optimum[onnxruntime])
+#
+# Chosen with ``besty_embedding_backend`` in site config. Every backend
+# returns a SentenceTransformer, so callers keep using ``encode``.
+
+import os
+
+import frappe
+from frappe.utils import cint
+
+DEFAULT_BACKEND = 'torch'
+
+# Intra-op threads per worker; gunicorn already runs one process per core
+DEFAULT_THREADS = 1
+
+
+def get_backend_name():
+    return frappe.conf.get('besty_embedding_backend') or DEFAULT_BACKEND
+
+
+def get_thread_count():
+    return max(cint(frappe.conf.get('besty_embedding_threads') or DEFAULT_THREADS), 1)
+
+
+def limit_threads(threads):
+    """Cap BLAS/OpenMP pools before the native libraries start them."""
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ.setdefault(variable, str(threads))
+
+
+def limit_torch_threads(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel op; the intra-op limit still applies
+        pass
+
+
+def load_torch(model_name, threads):
+    limit_threads(threads)
+    from sentence_transformers import SentenceTransformer
+
+    limit_torch_threads(threads)
+    return SentenceTransformer(model_name, device='cpu')
+
+
+def load_int8(model_name, threads):
+    model = load_torch(model_name, threads)
+    import torch
+
+    # Weights of every Linear layer become int8; activations are quantized per call
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_onnx(model_name, threads):
+    limit_threads(threads)
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = threads
+    session_options.inter_op_num_threads = 1
+    model_kwargs = {'provider': 'CPUExecutionProvider', 'session_options': session_options}
+    # e.g. onnx/model_qint8_avx2.onnx for a pre-quantized export
+    if frappe.conf.get('besty_onnx_file_name'):
+        model_kwargs['file_name'] = frappe.conf.get('besty_onnx_file_name')
+    return SentenceTransformer(model_name, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+
+
+BACKENDS = {
+    'torch': load_torch,
+    'int8': load_int8,
+    'onnx': load_onnx,
+}
+
+
+def load_model(model_name, backend=DEFAULT_BACKEND, threads=None):
+    """Load ``model_name`` with the named backend; raises ValueError for unknown ones."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    return BACKENDS[backend](model_name, threads or DEFAULT_THREADS)
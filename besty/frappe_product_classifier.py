@@ -2,346 +2,115 @@
 
 import frappe
 from frappe import _
+from frappe.utils import cint, sbool
+import hashlib
 import json
+import os
+import resource
+import threading
+import time
 from datetime import datetime, date
 from collections import Counter
-from sentence_transformers import SentenceTransformer, util
-from difflib import get_close_matches
+from besty.category_facets import adjust_facet_counts
+from besty.classification_cache import ClassificationCache
+from besty.classification_server import classify_remote, get_socket_path
+from besty.classification_stats import stats
+from besty.embedding_backends import DEFAULT_BACKEND, get_backend_name, get_thread_count
+from besty.price_comparison import comparison_key
+from besty.taxonomy import get_taxonomy, refresh_taxonomy
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_THRESHOLD = 0.6
 
 class ProductClassifier:
-    def __init__(self, model_name='all-MiniLM-L6-v2', threshold=0.6):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, threshold=DEFAULT_THRESHOLD, semantic=True,
+                 cache_size=10000, shared_cache=False, fuzzy_cutoff=0.8, taxonomy=None,
+                 backend=DEFAULT_BACKEND, threads=None):
+        # The SentenceTransformer model and keyword embeddings are only loaded when a
+        # word first falls through to Method 3 of find_category; with semantic=False
+        # the classifier is purely lexical and never imports torch at all.
+        self.model_name = model_name
         self.threshold = threshold
-        self.ignore_words = {'pams', 'brushed', 'mix', 'bag', 'wash', 'woolworths', 'fresh', 'bagged', 'value', 'kg', 'g', 'ml', 'l', 'pack', 'pk', 'ea','prepacked'}
-           
-        self.product_type_keywords = {
-            # Dairy & Eggs
-            'Dairy & Eggs': [
-                'milk', 'flavour milk', 'whole milk', 'skim milk', 'low-fat milk', 'butter', 
-                'unsalted butter', 'salted butter', 'cheese', 'cheddar', 'mozzarella', 
-                'parmesan', 'gouda', 'feta', 'brie', 'camembert', 'blue cheese', 
-                'cream cheese', 'goat cheese', 'ricotta', 'yogurt', 'Greek yogurt', 
-                'flavored yogurt', 'plain yogurt','mixed berry Yoghurt', 'strawberry yoghurt',
-                'cream', 'heavy cream', 'apricot yoghurt', 'vanilla yoghurt','vanilla bean yoghurt',
-                'banana yoghurt', 'peach yoghurt', 'mango yoghurt', 'raspberry yoghurt','boysenberries yoghurt',
-                'whipping cream', 'double cream', 'sour cream', 'custard', 
-                'margarine', 'eggs', 'chicken eggs', 'duck eggs', 'quail eggs', 
-                'buttermilk', 'kefir', 'curd', 'paneer', 'ghee', 'spread', 
-                'eggwhite', 'egg yolk', 'powdered milk', 'condensed milk', 
-                'evaporated milk', 'milkshake', 'ice cream', 'frozen yogurt', 
-                'whey', 'lactose-free milk', 'almond milk', 'soy milk', 
-                'oat milk', 'coconut milk', 'cashew milk', 'milk powder', 
-                'clarified butter', 'probiotic drinks', 'quark', 'clotted cream',
-                'soy milk','almond milk','coconut milk','lactose free milk','buttermilk',
-                'uht milk','cream cheese','soy milk','almond milk','coconut milk','yoghurt suckies'
-            ],
-
-            # Bread & Bakery
-            'Bread & Bakery': [
-                'bread', 'white bread', 'whole wheat bread', 'multigrain bread', 
-                'rye bread', 'sourdough', 'pita bread', 'ciabatta', 'focaccia', 
-                'roll', 'dinner roll', 'bun', 'burger bun', 'hot dog bun', 
-                'bagel', 'plain bagel', 'sesame bagel', 'everything bagel', 
-                'muffin', 'blueberry muffin', 'chocolate chip muffin', 
-                'croissant', 'almond croissant', 'pastry', 'danish', 'eclair', 
-                'strudel', 'cake', 'chocolate cake', 'vanilla cake', 'sponge cake', 
-                'fruit cake', 'loaf', 'banana bread', 'pumpkin bread', 
-                'baguette', 'crumpet', 'waffle', 'Belgian waffle', 'pancake', 
-                'donut', 'glazed donut', 'chocolate donut', 'doughnut', 'pie', 
-                'apple pie', 'cherry pie', 'pumpkin pie', 'tart', 'fruit tart', 
-                'custard tart', 'scone', 'plain scone', 'raisin scone', 
-                'brioche', 'flatbread', 'naan', 'paratha', 'chapati', 
-                'lavash', 'rolls', 'buns', 'wrap', 'tortilla', 'flour tortilla', 
-                'corn tortilla', 'cinnamon roll', 'pretzel', 'breadsticks', 
-                'English muffin', 'hot cross bun', 'shortbread', 'biscuit', 
-                'cracker', 'grissini', 'pavlova', 'macaron', 'cookie', 
-                'gingerbread', 'puff pastry', 'challah', 'matzo', 'baps', 
-                'wholemeal', 'batard','turnovers','pizza bread','ginger kisses',
-                'pita bread','farrah wraps'
-            ],
-
-            # Beverages
-           'Beverages': [
-                'juice', 'orange juice', 'apple juice', 'grape juice', 
-                'cranberry juice', 'pineapple juice', 'tomato juice', 
-                'pomegranate juice', 'carrot juice', 'beet juice', 'water', 
-                'sparkling water', 'mineral water', 'flavored water', 'coffee', 
-                'black coffee', 'espresso', 'latte', 'cappuccino', 'americano', 
-                'macchiato', 'mocha', 'iced coffee', 'cold brew', 'tea', 
-                'black tea', 'green tea', 'herbal tea', 'chai', 'matcha', 
-                'iced tea', 'drink', 'energy drink', 'sports drink', 'soda', 
-                'cola', 'lemon-lime soda', 'root beer', 'ginger ale', 'tonic water', 
-                'club soda', 'pop', 'beverage', 'smoothie', 'fruit smoothie', 
-                'protein shake', 'cocktail', 'martini', 'margarita', 'mojito', 
-                'pina colada', 'daiquiri', 'bloody mary', 'wine', 'red wine', 
-                'white wine', 'rosé wine', 'sparkling wine', 'champagne', 
-                'beer', 'ale', 'lager', 'stout', 'porter', 'pilsner', 
-                'cider', 'hard cider', 'spirits', 'liquor', 'vodka', 
-                'flavored vodka', 'gin', 'rum', 'dark rum', 'white rum', 
-                'whiskey', 'bourbon', 'scotch', 'rye whiskey', 'cordial', 
-                'syrup', 'simple syrup', 'grenadine', 'concentrate', 'shake', 
-                'milkshake', 'chocolate milkshake', 'strawberry milkshake', 
-                'bubble tea', 'kombucha', 'matcha latte', 'hot chocolate', 
-                'chai latte', 'iced matcha', 'tonic', 'lemonade', 'limeade'
-            ],
-
-            # Pantry Staples
-            'Pantry Items': [
-                'sugar', 'white sugar', 'brown sugar', 'powdered sugar', 
-                'salt', 'sea salt', 'kosher salt', 'pink Himalayan salt', 
-                'flour', 'all-purpose flour', 'whole wheat flour', 'bread flour', 
-                'oil', 'olive oil', 'vegetable oil', 'canola oil', 'coconut oil', 
-                'sunflower oil', 'avocado oil', 'sesame oil', 'vinegar', 
-                'white vinegar', 'apple cider vinegar', 'balsamic vinegar', 
-                'rice vinegar', 'red wine vinegar', 'sauce', 'soy sauce', 
-                'hot sauce', 'BBQ sauce', 'tomato sauce', 'paste', 'tomato paste', 
-                'chili paste', 'garlic paste', 'soup', 'stock', 'chicken stock', 
-                'beef stock', 'vegetable stock', 'broth', 'seasoning', 
-                'spice', 'herb', 'basil', 'oregano', 'thyme', 'extract', 
-                'vanilla extract', 'almond extract', 'essence', 'powder', 
-                'garlic powder', 'onion powder', 'cocoa powder', 'mix', 
-                'pancake mix', 'cake mix', 'marinade', 'glaze', 
-                'ranch dressing', 'Italian dressing', 'condiment', 'mayo', 
-                'mayonnaise', 'mustard', 'Dijon mustard', 'whole grain mustard', 
-                'ketchup', 'relish', 'chutney', 'jam', 'strawberry jam', 
-                'apricot jam', 'jelly', 'preserves', 'honey', 'maple syrup', 
-                'syrup', 'peanut butter', 'almond butter', 'Nutella', 'marmite', 
-                'vegemite', 'tahini', 'molasses', 'cornstarch', 'yeast', 
-                'baking soda', 'baking powder', 'coriander', 'cumin', 'parsley',
-                'pesto', 'tzatziki'
-            ],
-            # Grains & Pasta
-            'Grains & Pasta': [
-                'cereal', 'cornflakes', 'bran flakes', 'pasta', 'spaghetti', 
-                'penne', 'linguine', 'fettuccine', 'macaroni', 'lasagna', 
-                'ravioli', 'tortellini', 'angel hair pasta', 'ziti', 
-                'rice', 'white rice', 'brown rice', 'basmati rice', 'jasmine rice', 
-                'wild rice', 'noodle', 'egg noodle', 'ramen', 'udon', 'soba', 
-                'grain', 'quinoa', 'couscous', 'oats', 'steel-cut oats', 
-                'rolled oats', 'instant oatmeal', 'porridge', 'muesli', 
-                'granola', 'wheat', 'bulgur wheat', 'barley', 'cornmeal', 
-                'polenta', 'semolina', 'flour', 'buckwheat flour', 'meal', 
-                'bran', 'millet', 'amaranth', 'teff', 'sorghum'
-            ],
-
-            # Snacks & Confectionery
-            'Snacks & Confectionery': [
-                'chips', 'potato chips', 'tortilla chips', 'crisps', 
-                'crackers', 'whole grain crackers', 'cheese crackers', 
-                'cookies', 'chocolate chip cookies', 'oatmeal cookies', 
-                'biscuit', 'digestive biscuits', 'shortbread', 'wafer', 
-                'popcorn', 'buttered popcorn', 'caramel popcorn', 'nuts', 
-                'almonds', 'cashews', 'walnuts', 'peanuts', 'pistachios', 
-                'chocolate', 'milk chocolate', 'dark chocolate', 'white chocolate', 
-                'candy', 'hard candy', 'chewy candy', 'lollies', 'sweets', 
-                'gum', 'mints', 'bar', 'granola bar', 'energy bar', 
-                'snack', 'pretzel', 'soft pretzel', 'nachos', 'dip', 
-                'guacamole', 'salsa', 'hummus','hummmus', 'trail mix', 'granola', 
-                'fruit snacks', 'marshmallows', 'toffee', 'fudge', 'licorice',
-                'biersticks'
-            ],
-
-            # Fruits & Vegetables
-            'Fruits & Vegetables': [
-                'apple', 'banana', 'orange', 
-                'lemon', 'lime', 'grape', 'berry', 'berries', 
-                'strawberry', 'blueberry', 'raspberry', 'blackberry', 
-                'cranberry', 'gooseberry', 'boysenberry', 'huckleberry', 
-                'melon', 'watermelon', 'cantaloupe', 'honeydew', 
-                'pineapple', 'mango', 'peach', 'plum', 'pear', 
-                'apricot', 'nectarine', 'fig', 'date', 'raisin', 
-                'currant', 'sultana', 'pomegranate', 'kiwi', 
-                'papaya', 'guava', 'passionfruit', 'dragonfruit', 
-                'lychee', 'longan', 'persimmon', 'starfruit', 
-                'jackfruit', 'durian', 'coconut', 'avocado', 
-                'tomato', 'potato', 'potatoes', 'sweet potato', 'carrot', 
-                'onion', 'garlic', 'shallot', 'leek', 'lettuce', 
-                'cabbage', 'broccoli', 'cauliflower', 'brussels sprout', 
-                'pepper', 'bell pepper', 'chili pepper', 'cucumber', 
-                'zucchini', 'courgette', 'celery', 'asparagus', 
-                'mushroom', 'corn', 'sweetcorn', 'pea', 'bean', 
-                'green bean', 'snow pea', 'sugar snap pea', 
-                'edamame', 'chickpea', 'lentil', 'sprout', 
-                'spinach', 'kale', 'collard greens', 'mustard greens', 
-                'turnip', 'beet', 'radish', 'rutabaga', 
-                'parsnip', 'swede', 'yam', 'eggplant', 'artichoke', 
-                'fennel', 'okra', 'bamboo shoot', 'watercress', 
-                'seaweed', 'arugula', 'chard', 'bok choy', 
-                'daikon', 'jicama', 'horseradish', 'pumpkin', 
-                'squash', 'acorn squash', 'butternut squash', 
-                'spaghetti squash', 'gourd', 'taro', 'cassava',
-                'mandarins', 'slaw', 'rocket','pitahaya','dragonfruit',
-                'paw paw','lettuce','salad','coleslaw','cabbage slaw',
-                'kumara', 'cos mix'
-            ],
-
-            # Meat & Seafood
-            'Meat & Seafood': [
-                'meat', 'red meat', 'beef', 'ground beef', 'steak', 'ribeye steak', 
-                'sirloin steak', 'pork', 'pork chops', 'pork loin', 'lamb', 
-                'lamb chops', 'leg of lamb', 'chicken', 'chicken breast', 
-                'chicken thighs', 'chicken wings', 'whole chicken', 'turkey', 
-                'ground turkey', 'turkey breast', 'duck', 'duck breast', 
-                'bacon', 'pork bacon', 'turkey bacon', 'ham', 'cooked ham', 
-                'honey-glazed ham', 'sausage', 'beef sausage', 'pork sausage', 
-                'turkey sausage', 'salami', 'pepperoni', 'mince', 'ground meat', 
-                'veal', 'game meat', 'venison', 'rabbit', 'steak', 'chop', 
-                'lamb chop', 'pork chop', 'roast', 'beef roast', 'pork roast', 
-                'fillet', 'fish', 'white fish', 'salmon', 'smoked salmon', 
-                'tuna', 'canned tuna', 'fresh tuna', 'cod', 'haddock', 
-                'tilapia', 'snapper', 'mackerel', 'prawns', 'shrimp', 
-                'jumbo shrimp', 'shellfish', 'mussels', 'oysters', 'clams', 
-                'scallops', 'crab', 'king crab', 'crab legs', 'lobster', 
-                'lobster tail', 'seafood', 'calamari', 'octopus', 'anchovies', 
-                'sardines', 'fish fingers', 'fish fillet', 'crayfish', 'roe',
-                'frankfurters', 'chorizo', 'saveloys', 'franks', 'rissoles', 
-                'tenderloins', 'pastrami','sizzlers'
-            ],
-
-            # Frozen Foods
-            'Frozen Foods': [
-                'ice cream', 'vanilla ice cream', 'chocolate ice cream', 
-                'strawberry ice cream', 'gelato', 'sorbet', 'lemon sorbet', 
-                'mango sorbet', 'frozen yogurt', 'froyo', 'frozen pizza', 
-                'pepperoni pizza', 'vegetarian pizza', 'frozen meal', 
-                'frozen dinner', 'TV dinner', 'microwave meal', 
-                'frozen dessert', 'popsicle', 'ice pop', 'frozen fruit', 
-                'frozen berries', 'frozen peas', 'frozen corn', 'frozen vegetables', 
-                'ice', 'crushed ice', 'ice cubes', 'frozen waffles', 
-                'frozen pancakes', 'frozen pastries', 'frozen pie', 'pot pies', 
-                'frozen dumplings', 'frozen spring rolls', 'frozen seafood', 
-                'frozen shrimp', 'frozen fish fillets', 'frozen chicken nuggets', 
-                'frozen fries', 'frozen chips', 'frozen bread dough'
-            ],
-            # Canned & Packaged Foods
-            'Canned & Packaged Foods': [
-                'soup', 'chicken soup', 'tomato soup', 'vegetable soup', 
-                'beans', 'baked beans', 'kidney beans', 'black beans', 
-                'chickpeas', 'lentils', 'tomatoes', 'diced tomatoes', 
-                'crushed tomatoes', 'tomato paste', 'corn', 'sweet corn', 
-                'cream-style corn', 'peas', 'green peas', 'fruit', 'canned fruit', 
-                'peaches', 'pineapple', 'fruit cocktail', 'tuna', 'canned tuna', 
-                'salmon', 'canned salmon', 'sardines', 'canned sardines', 
-                'anchovies', 'meal', 'ready-to-eat meal', 'instant noodles', 
-                'macaroni and cheese', 'dinner', 'pasta', 'instant pasta', 
-                'sauce', 'tomato sauce', 'alfredo sauce', 'vegetables', 
-                'mixed vegetables', 'spinach', 'artichokes', 'olives', 'mix', 
-                'pancake mix', 'muffin mix', 'cake mix', 'cornbread mix', 
-                'stuffing mix', 'noodles', 'rice', 'canned gravy', 'broth', 
-                'chicken broth', 'beef broth'
-            ],
-
-            # Baby & Infant
-            'Baby & Infant': [
-                'formula', 'infant formula', 'toddler formula', 'food', 
-                'baby food', 'stage 1 baby food', 'stage 2 baby food', 
-                'puree', 'fruit puree', 'vegetable puree', 'snack', 
-                'baby snack', 'teething biscuits', 'puffs', 'cereal', 
-                'baby cereal', 'rice cereal', 'oatmeal cereal', 'juice', 
-                'baby juice', 'apple juice', 'pear juice', 'baby milk', 'milk powder',
-                'toddler milk', 'baby yogurt', 'baby pudding'
-            ],
-
-            # Pet Food
-            'Pet Food': [
-                'food', 'dog food', 'cat food', 'puppy food', 'kitten food', 
-                'wet food', 'canned food', 'dry food', 'treats', 
-                'dog treats', 'cat treats', 'kibble', 'dry kibble', 
-                'biscuits', 'dog biscuits', 'cat biscuits', 'feed', 
-                'bird feed', 'fish food', 'rabbit feed', 'hamster feed', 
-                'pellets', 'grain-free food', 'high-protein food', 
-                'senior pet food', 'special diet food'
-            ],
-
-            # Health & Wellness
-            'Health & Wellness': [
-                'supplement', 'dietary supplement', 'multivitamin', 'vitamin', 
-                'vitamin C', 'vitamin D', 'vitamin B12', 'protein', 'protein powder', 
-                'whey protein', 'plant-based protein', 'collagen', 'amino acids', 
-                'powder', 'greens powder', 'superfood powder', 'bar', 'protein bar', 
-                'energy bar', 'meal replacement bar', 'shake', 'protein shake', 
-                'meal replacement shake', 'smoothie mix', 'tablet', 'chewable tablet', 
-                'capsule', 'softgel', 'gummy', 'omega-3 gummies', 'fiber gummies', 
-                'oil', 'fish oil', 'flaxseed oil', 'CBD oil', 'essential oil', 
-                'immune booster', 'detox supplement', 'herbal supplement'
-            ],
-
-            # Cleaning & Household
-           'Cleaning & Household': [
-                'cleaner', 'all-purpose cleaner', 'glass cleaner', 'bathroom cleaner', 
-                'floor cleaner', 'detergent', 'laundry detergent', 'dish detergent', 
-                'soap', 'dish soap', 'hand soap', 'bar soap', 'powder', 'laundry powder', 
-                'cleaning powder', 'liquid', 'cleaning liquid', 'detergent liquid', 
-                'spray', 'disinfectant spray', 'air freshener spray', 'wipes', 
-                'disinfectant wipes', 'baby wipes', 'surface wipes', 'bleach', 
-                'toilet bleach', 'household bleach', 'freshener', 'air freshener', 
-                'odor eliminator', 'paper', 'paper towel', 'toilet paper', 
-                'tissue paper', 'towel', 'kitchen towel', 'bath towel', 'tissue', 
-                'facial tissue', 'wrap', 'cling wrap', 'plastic wrap', 'bag', 
-                'garbage bag', 'reusable bag', 'foil', 'aluminum foil', 'filter', 
-                'water filter', 'air filter', 'vacuum bag', 'dryer sheet'
-            ],
-
-            # Personal Care
-           'Personal Care': [
-                'shampoo', 'anti-dandruff shampoo', 'volumizing shampoo', 
-                'conditioner', 'deep conditioner', 'leave-in conditioner', 
-                'soap', 'bar soap', 'liquid soap', 'wash', 'body wash', 
-                'face wash', 'lotion', 'body lotion', 'hand lotion', 
-                'moisturizing cream', 'anti-aging cream', 'deodorant', 'stick deodorant', 
-                'spray deodorant', 'toothpaste', 'whitening toothpaste', 
-                'sensitive toothpaste', 'mouthwash', 'antibacterial mouthwash', 
-                'floss', 'dental floss', 'floss picks', 'brush', 'toothbrush', 
-                'hairbrush', 'razor', 'disposable razor', 'electric razor', 
-                'tissue', 'facial tissue', 'wipes', 'makeup wipes', 'baby wipes', 
-                'sanitizer', 'hand sanitizer', 'spray sanitizer', 'sunscreen', 
-                'SPF moisturizer', 'sunblock', 'lip balm', 'nail clippers', 'cotton swabs'
-            ],
-
-            # Miscellaneous
-            'Miscellaneous': [
-                'set', 'gift set', 'starter set', 'pack', 'multi-pack', 
-                'value pack', 'kit', 'starter kit', 'travel kit', 'bundle', 
-                'product bundle', 'collection', 'gift collection', 'variety', 
-                'variety pack', 'selection', 'curated selection', 'assortment', 
-                'mixed assortment', 'mix', 'trail mix', 'combo', 'combo pack', 
-                'package', 'care package', 'gift package', 'gift', 'gift card', 
-                'gift basket', 'subscription box'
-            ]
-
-        }
-
-
-        self.keyword_to_category = {
-            'milk': 'Milk',
-            'flavour milk': 'Flavored Milk',
-            'whole milk': 'Whole Milk',
-            'skim milk': 'Skim Milk',
-            'low-fat milk': 'Low-Fat Milk',
-            'butter': 'Butter',
-            'cheese': 'Cheese',
-            'yogurt': 'Yogurt',
-            'cream': 'Cream',
-            # Add more mappings as needed
-        }
-
-        # Create reverse mapping with plural forms and embeddings for keywords
-        self.keyword_to_category = {}
-        self.keyword_embeddings = {}
-        for category, keywords in self.product_type_keywords.items():
-            for keyword in keywords:
-                # Add original form
-                self.keyword_to_category[keyword] = category
-                # Add plural forms
-                self.keyword_to_category[keyword + 's'] = category
-                # Handle special cases
-                if keyword.endswith('y'):
-                    self.keyword_to_category[keyword[:-1] + 'ies'] = category
-                elif keyword.endswith('f'):
-                    self.keyword_to_category[keyword[:-1] + 'ves'] = category
-                
-                # Create embedding for each keyword
-                self.keyword_embeddings[keyword] = self.model.encode(keyword, convert_to_tensor=True)
+        self.semantic = semantic
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.backend = backend
+        self.threads = threads
+        self._model = None
+        self._keyword_store = None
+        self._load_lock = threading.RLock()
+        # Time and memory of the lazy loads, reported by get_classifier_stats
+        self.load_stats = {}
+        taxonomy = taxonomy or get_taxonomy()
+
+        # Memoized word -> find_category and name -> classification results,
+        # namespaced by version so taxonomy or model changes start them afresh
+        self.version = classifier_version(model_name, threshold, semantic, taxonomy, backend)
+        self.word_cache = ClassificationCache(f'{self.version}|word', cache_size, shared_cache)
+        self.name_cache = ClassificationCache(f'{self.version}|name', cache_size, shared_cache)
+
+        # Word lists and their compiled lookups are shared, read-only, by every
+        # classifier built from the same taxonomy version
+        self.taxonomy = taxonomy
+        self.ignore_words = taxonomy.ignore_words
+        self.product_type_keywords = taxonomy.product_type_keywords
+        self.priority_category = taxonomy.priority_category
+        self.priority_matches = taxonomy.priority_matches
+        self.descriptive_words = taxonomy.descriptive_words
+        self.whitelist = taxonomy.whitelist
+        self.keyword_to_category = taxonomy.keyword_to_category
+        self.keyword_index = taxonomy.keyword_index
+        self.keywords = taxonomy.keywords
+        self.fuzzy_index = taxonomy.fuzzy_index
+
+    @property
+    def model(self):
+        """The SentenceTransformer model, imported and loaded on first use with the chosen backend."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from besty.embedding_backends import load_model
+                    rss_before = get_rss()
+                    started = time.perf_counter()
+                    self._model = load_model(self.model_name, self.backend, self.threads)
+                    self.record_load('model', started, rss_before)
+        return self._model
+
+    @property
+    def keyword_store(self):
+        """Keyword embedding matrix, loaded from the on-disk cache or built on first use."""
+        if self._keyword_store is None:
+            with self._load_lock:
+                if self._keyword_store is None:
+                    from besty.keyword_embeddings import KeywordEmbeddingStore
+                    model_loaded = 'model' in self.load_stats
+                    rss_before = get_rss()
+                    started = time.perf_counter()
+                    self._keyword_store = KeywordEmbeddingStore(
+                        lambda: self.model, self.embedding_cache_name, self.keywords
+                    )
+                    # Encoding missing keywords may have loaded the model, which is recorded on its own
+                    nested = self.load_stats['model'] if not model_loaded and 'model' in self.load_stats else None
+                    self.record_load('keyword_store', started, rss_before, nested)
+        return self._keyword_store
+
+    def record_load(self, component, started, rss_before, nested=None):
+        load_time = time.perf_counter() - started
+        memory = get_rss() - rss_before
+        if nested:
+            load_time -= nested['load_time']
+            memory -= nested['memory']
+        self.load_stats[component] = {'load_time': load_time, 'memory': memory}
+
+    def warm_up(self):
+        """Load everything a classification may need, including the model and keyword matrix when semantic."""
+        if self.semantic:
+            self.model
+            self.keyword_store
+
+    @property
+    def embedding_cache_name(self):
+        """Backends embed slightly differently, so each gets its own keyword cache."""
+        return self.model_name if self.backend == DEFAULT_BACKEND else f'{self.model_name}-{self.backend}'
 
     def get_last_word(self, product_name):
         """Extract the last word from the product name, ignoring specified terms."""
@@ -370,95 +139,170 @@ class ProductClassifier:
         """
         Enhanced method to handle multi-word product names with priority matches.
         """
-        words = self.get_all_words(product_name)
-        
+        with stats.timer('classify'):
+            result = self.name_cache.get(product_name.lower())
+            if result is None:
+                result, specific_words = self.match_keywords(product_name)
+                if not result:
+                    result = self.classify_fallback(specific_words, self.find_category)
+                self.name_cache.set(product_name.lower(), result)
+
+        stats.count('names')
+        stats.record_match(result['match_type'])
+        return self.with_matched_name(result, product_name)
+
+    def classify_many(self, product_names):
+        """
+        Classify a batch of product names, returning results in input order.
+
+        Names are de-duplicated case-insensitively and run through the keyword
+        stages first. Words left over for the semantic fallback are then encoded
+        in one batched call, so results match classify_single_product name for
+        name without a model call per word.
+        """
+        with stats.timer('classify_many'):
+            results = self.classify_unique(product_names)
+
+        stats.count('names', len(product_names))
+        for product_name in product_names:
+            stats.record_match(results[product_name.lower()]['match_type'])
+        return [
+            self.with_matched_name(results[product_name.lower()], product_name)
+            for product_name in product_names
+        ]
+
+    def classify_unique(self, product_names):
+        """classify_many's work: a result per distinct lowercased name."""
+        results = {}
+        pending = {}
+        for product_name in dict.fromkeys(name.lower() for name in product_names):
+            result = self.name_cache.get(product_name)
+            if result is None:
+                result, specific_words = self.match_keywords(product_name)
+            if result:
+                results[product_name] = result
+            else:
+                pending[product_name] = specific_words
+
+        # Only words reached before a lexical hit would ever be sent to the model.
+        # A None entry means the word still needs a semantic lookup.
+        word_results = {}
+        semantic_words = {}
+        for specific_words in pending.values():
+            for word in reversed(specific_words):
+                if word not in word_results:
+                    word_results[word] = self.word_cache.get(word) or self.find_category_lexical(word)
+                    if word_results[word]:
+                        self.word_cache.set(word, word_results[word])
+                    elif self.semantic:
+                        semantic_words[word] = None
+                if word_results[word] and word_results[word][0]:
+                    break
+
+        for word, match in zip(semantic_words, self.semantic_match_many(list(semantic_words))):
+            word_results[word] = self.semantic_result(word, match)
+            self.word_cache.set(word, word_results[word])
+
+        def find_category(word):
+            return word_results[word] or (None, word, 0.0, 'none')
+
+        for product_name, specific_words in pending.items():
+            results[product_name] = self.classify_fallback(specific_words, find_category)
+            self.name_cache.set(product_name, results[product_name])
+
+        return results
+
+    @staticmethod
+    def with_matched_name(result, product_name):
+        """Copy a cached result, restoring the caller's spelling for full-name matches."""
+        result = dict(result)
+        if result['match_type'] == 'exact_full_match':
+            result['matched_word'] = product_name
+        return result
+
+    def match_keywords(self, product_name):
+        """
+        Run the exact, priority, specific word and multi-word stages.
+        Returns ``(result, specific_words)``; ``result`` is None when the name
+        still needs the per-word fallback over ``specific_words``.
+        """
+        with stats.timer('tokenize'):
+            words = self.get_all_words(product_name)
+
+        with stats.timer('keyword_match'):
+            return self.match_keyword_stages(product_name, words)
+
+    def match_keyword_stages(self, product_name, words):
+        """match_keywords after tokenizing, so the two are timed apart."""
         if not words:
             return {
                 'category': 'Unknown',
                 'confidence': 0.0,
                 'matched_word': '',
                 'match_type': 'none'
-            }
+            }, []
 
         # Check for exact match first
-        exact_match = self.keyword_to_category.get(product_name.lower())
+        lowered_name = product_name.lower()
+        exact_match = self.keyword_to_category.get(lowered_name)
         if exact_match:
             return {
                 'category': exact_match,
                 'confidence': 1.0,
                 'matched_word': product_name,
                 'match_type': 'exact_full_match'
-            }
-
-        # Define a list of priority matches based on product_type_keywords
-        priority_matches = [
-            'flavour milk', 'whole milk', 'skim milk', 'low-fat milk', 
-            'butter', 'cheese', 'strawberry yogurt', 'cream', 'soy milk', 'almond milk','yoghurt suckies'
-        ]
+            }, []
 
         # Check for priority matches first
-        for priority in priority_matches:
-            if priority in product_name.lower():
-                return {
-                    'category': 'Dairy & Eggs',  # Assuming all priority matches belong to this category
-                    'confidence': 1.0,
-                    'matched_word': priority,
-                    'match_type': 'priority_match'
-                }
-
-        # Descriptive words to ignore when classifying
-        descriptive_words = {
-            'smooth', 'creamy', 'fresh', 'low', 'fat', 'high', 'light', 
-            'original', 'classic', 'new', 'traditional', 'premium', 
-            'best', 'natural'
-        }
-
-        # Whitelist for specific combinations
-        whitelist = {
-            'dark chocolate', 'fresh strawberry', 'organic apple', 
-            'sugar-free vanilla', 'low-fat yogurt'
-        }
+        priority = self.keyword_index.match_priority(lowered_name)
+        if priority:
+            return {
+                'category': self.priority_category,
+                'confidence': 1.0,
+                'matched_word': priority,
+                'match_type': 'priority_match'
+            }, []
 
         # Find the most specific non-descriptive word
-        specific_words = []
-        for word in words:
-            if word not in descriptive_words or product_name.lower() in whitelist:
-                specific_words.append(word)
+        if lowered_name in self.whitelist:
+            specific_words = list(words)
+        else:
+            specific_words = [word for word in words if word not in self.descriptive_words]
 
         # If all specific words are filtered out, use the last original word
         if not specific_words:
             specific_words = [words[-1]]
         
         # Check for specific matches in product_type_keywords
-        for category, keywords in self.product_type_keywords.items():
-            for keyword in keywords:
-                if keyword in specific_words:
-                    return {
-                        'category': category,
-                        'confidence': 1.0,
-                        'matched_word': keyword,
-                        'match_type': 'exact_specific_word'
-                    }
+        word_match = self.keyword_index.match_word(specific_words)
+        if word_match:
+            return {
+                'category': word_match[1],
+                'confidence': 1.0,
+                'matched_word': word_match[0],
+                'match_type': 'exact_specific_word'
+            }, specific_words
             
         # Now check for multi-word phrases
-        multi_word_matches = [' '.join(specific_words[i:i+2]) for i in range(len(specific_words)-1)]
-        for multi_word in multi_word_matches:
-            for category, keywords in self.product_type_keywords.items():
-                if multi_word in keywords:
-                    return {
-                        'category': category,
-                        'confidence': 1.0,
-                        'matched_word': multi_word,
-                        'match_type': 'exact_multi_word_match'
-                    }
-
-        # Fallback to semantic matching
+        phrase_match = self.keyword_index.match_phrase(specific_words)
+        if phrase_match:
+            return {
+                'category': phrase_match[1],
+                'confidence': 1.0,
+                'matched_word': phrase_match[0],
+                'match_type': 'exact_multi_word_match'
+            }, specific_words
+
+        return None, specific_words
+
+    def classify_fallback(self, specific_words, find_category):
+        """Classify by the last specific word that find_category can place."""
         for word in reversed(specific_words):
-            last_word_result = self.find_category(word)
+            last_word_result = find_category(word)
             if last_word_result[0]:
                 return {
                     'category': last_word_result[0],
-                    'confidence': 0.7,
+                    'confidence': last_word_result[2],
                     'matched_word': last_word_result[1],
                     'match_type': 'last_specific_word'
                 }
@@ -469,44 +313,267 @@ class ProductClassifier:
             'matched_word': '',
             'match_type': 'none'
         }
-   
 
     def find_category(self, word):
         """Try to find category for a word using multiple methods."""
+        result = self.word_cache.get(word)
+        if result is None:
+            result = self.find_category_lexical(word)
+
+            # Method 3: Semantic similarity using SBERT
+            if result is None and word and self.semantic:
+                result = self.semantic_result(word, self.semantic_match(word))
+
+            if result is None:
+                result = (None, word, 0.0, 'none')
+            self.word_cache.set(word, result)
+
+        return result
+
+    def find_category_lexical(self, word):
+        """Methods 1 and 2 of find_category; returns None when neither matches."""
         # Method 1: Direct lookup including plural forms
         category = self.keyword_to_category.get(word)
         if category:
             return category, word, 1.0, 'exact'
 
         # Method 2: Fuzzy string matching
-        all_keywords = list(self.keyword_embeddings.keys())
-        close_matches = get_close_matches(word, all_keywords, n=1, cutoff=0.8)
+        with stats.timer('fuzzy_match'):
+            close_matches = self.fuzzy_index.close_matches(word, n=1, cutoff=self.fuzzy_cutoff)
         if close_matches:
             matched_word = close_matches[0]
             return self.keyword_to_category[matched_word], matched_word, 0.9, 'fuzzy'
 
-        # Method 3: Semantic similarity using SBERT
-        if word:
-            word_embedding = self.model.encode(word, convert_to_tensor=True)
-            best_score = 0
-            best_match = None
-            
-            for keyword, keyword_embedding in self.keyword_embeddings.items():
-                similarity = util.cos_sim(word_embedding, keyword_embedding).item()
-                if similarity > best_score:
-                    best_score = similarity
-                    best_match = keyword
+        return None
 
-            if best_score > self.threshold:
-                return (self.keyword_to_category[best_match], best_match, 
-                        best_score, 'semantic')
+    def semantic_result(self, word, match):
+        """Turn a semantic_match tuple into a find_category result."""
+        best_match, best_score, margin = match
+        if best_score > self.threshold:
+            return (self.keyword_to_category[best_match], best_match, 
+                    best_score, 'semantic')
 
         return None, word, 0.0, 'none'
 
+    def semantic_match(self, word):
+        """
+        Find the nearest keyword to a word by cosine similarity.
+        Returns the best keyword, its score and its margin over the runner-up.
+        """
+        return self.semantic_match_many([word])[0]
+
+    def semantic_match_many(self, words):
+        """semantic_match for a list of words, encoded in one batch."""
+        if not words:
+            return []
+
+        stats.count('semantic_words', len(words))
+        with stats.timer('semantic_encode'):
+            word_embeddings = self.model.encode(words, convert_to_numpy=True, normalize_embeddings=True)
+        with stats.timer('semantic_search'):
+            nearest_keywords = self.keyword_store.top_k_many(word_embeddings, k=2)
+
+        matches = []
+        for nearest in nearest_keywords:
+            best_match, best_score = nearest[0]
+            margin = best_score - nearest[1][1] if len(nearest) > 1 else best_score
+            matches.append((best_match, best_score, margin))
+        return matches
+
+def semantic_enabled():
+    """False when site config sets besty_classifier_semantic to 0 (pure lexical mode)."""
+    return bool(cint(frappe.conf.get('besty_classifier_semantic', 1)))
+
+def classifier_version(model_name=DEFAULT_MODEL_NAME, threshold=DEFAULT_THRESHOLD, semantic=True, taxonomy=None,
+                       backend=DEFAULT_BACKEND):
+    """Identifies the taxonomy and matching backend behind a classification."""
+    if not semantic:
+        matcher = 'lexical'
+    elif backend == DEFAULT_BACKEND:
+        matcher = f"{model_name}|{threshold}"
+    else:
+        matcher = f"{model_name}|{threshold}|{backend}"
+    return f"{(taxonomy or get_taxonomy()).version}|{matcher}"
+
+def classification_fingerprint(productname, model_name=DEFAULT_MODEL_NAME, threshold=DEFAULT_THRESHOLD, semantic=None,
+                               backend=None):
+    """
+    Fingerprint of everything a classification depends on: the product name and
+    the taxonomy, model and threshold used. While an item's stored fingerprint
+    still matches, reclassifying it would give the same result.
+    """
+    if semantic is None:
+        semantic = semantic_enabled()
+    payload = f"{classifier_version(model_name, threshold, semantic, backend=backend or get_backend_name())}|{productname}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+# Classifiers live for the whole worker process, not just one request.
+# Keyed by (model_name, threshold, semantic, backend); guarded by a lock so concurrent
+# threads never build the same model twice.
+_classifiers = {}
+_classifier_stats = {}
+_classifiers_lock = threading.Lock()
+_classifiers_generation = None
+_generation_checked_at = 0.0
+
+CLASSIFIER_GENERATION_KEY = 'besty_classifier_generation'
+GENERATION_CHECK_INTERVAL = 30
+
+def get_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def get_classifier(model_name=DEFAULT_MODEL_NAME, threshold=DEFAULT_THRESHOLD, semantic=None):
+    """
+    Return the process-wide ProductClassifier for a model and threshold,
+    building it on first use. ``semantic`` and the embedding backend come
+    from the site config.
+    """
+    check_classifier_generation()
+
+    if semantic is None:
+        semantic = semantic_enabled()
+    backend = get_backend_name()
+    key = (model_name, threshold, semantic, backend)
+    classifier = _classifiers.get(key)
+    if classifier is None:
+        with _classifiers_lock:
+            classifier = _classifiers.get(key)
+            if classifier is None:
+                rss_before = get_rss()
+                started = time.perf_counter()
+                classifier = ProductClassifier(
+                    model_name, threshold, semantic,
+                    cache_size=cint(frappe.conf.get('besty_classification_cache_size', 10000)),
+                    shared_cache=bool(cint(frappe.conf.get('besty_shared_classification_cache'))),
+                    backend=backend,
+                    threads=get_thread_count()
+                )
+                _classifier_stats[key] = {
+                    'load_time': time.perf_counter() - started,
+                    'memory': get_rss() - rss_before,
+                    'loaded_at': time.time(),
+                    'taxonomy_version': classifier.taxonomy.version
+                }
+                _classifiers[key] = classifier
+    return classifier
+
+def invalidate_classifiers(all_workers=True):
+    """
+    Drop cached classifiers so the next get_classifier call rebuilds them.
+    With ``all_workers``, other processes on the site notice within
+    GENERATION_CHECK_INTERVAL seconds and drop theirs too.
+    """
+    global _classifiers_generation
+    with _classifiers_lock:
+        _classifiers.clear()
+        _classifier_stats.clear()
+        if all_workers:
+            _classifiers_generation = frappe.generate_hash(length=10)
+            frappe.cache().set_value(CLASSIFIER_GENERATION_KEY, _classifiers_generation)
+
+def check_classifier_generation():
+    """
+    Drop local classifiers if another worker invalidated them since the last
+    check, and pick up edits to the taxonomy file.
+    """
+    global _classifiers_generation, _generation_checked_at
+    now = time.monotonic()
+    if now - _generation_checked_at < GENERATION_CHECK_INTERVAL:
+        return
+
+    _generation_checked_at = now
+    generation = frappe.cache().get_value(CLASSIFIER_GENERATION_KEY)
+    if generation != _classifiers_generation:
+        _classifiers_generation = generation
+        invalidate_classifiers(all_workers=False)
+
+    if refresh_taxonomy() and _classifiers:
+        threading.Thread(target=reload_classifiers, args=(get_taxonomy(),), daemon=True).start()
+
+def reload_classifiers(taxonomy):
+    """
+    Rebuild every loaded classifier against a new taxonomy and swap each one in
+    when it is ready, so requests keep using the old one meanwhile. The
+    embedding model is carried over; keyword embeddings are topped up lazily.
+    """
+    for key, old in list(_classifiers.items()):
+        rss_before = get_rss()
+        started = time.perf_counter()
+        classifier = ProductClassifier(
+            old.model_name, old.threshold, old.semantic,
+            cache_size=old.word_cache.maxsize,
+            shared_cache=old.word_cache.shared,
+            fuzzy_cutoff=old.fuzzy_cutoff,
+            taxonomy=taxonomy,
+            backend=old.backend,
+            threads=old.threads
+        )
+        classifier._model = old._model
+        if 'model' in old.load_stats:
+            classifier.load_stats['model'] = old.load_stats['model']
+        with _classifiers_lock:
+            if _classifiers.get(key) is old:
+                _classifiers[key] = classifier
+                _classifier_stats[key] = {
+                    'load_time': time.perf_counter() - started,
+                    'memory': get_rss() - rss_before,
+                    'loaded_at': time.time(),
+                    'taxonomy_version': taxonomy.version
+                }
+
+def warm_up_classifier():
+    """
+    before_request/before_job hook. When ``besty_warm_classifier`` is set in
+    site config, build the default classifier as soon as a worker starts
+    serving instead of on its first Product Item write. Skipped when a
+    classification server hosts the model instead.
+    """
+    if not _classifiers and frappe.conf.get('besty_warm_classifier') and not get_socket_path():
+        get_classifier().warm_up()
+
+def get_classifier_stats():
+    """Load time (seconds), memory (bytes) and cache counters of each classifier in this process."""
+    classifiers = []
+    for key, classifier_stats in list(_classifier_stats.items()):
+        model_name, threshold, semantic, backend = key
+        classifier = _classifiers.get(key)
+        # The lexical tables are built by get_classifier, the model and keyword matrix on first use
+        lazy_loads = dict(classifier.load_stats) if classifier else {}
+        classifiers.append({
+            'model_name': model_name,
+            'threshold': threshold,
+            'semantic': semantic,
+            'backend': backend,
+            'word_cache': classifier.word_cache.stats() if classifier else None,
+            'name_cache': classifier.name_cache.stats() if classifier else None,
+            **classifier_stats,
+            'load_time': classifier_stats['load_time'] + sum(load['load_time'] for load in lazy_loads.values()),
+            'memory': classifier_stats['memory'] + sum(load['memory'] for load in lazy_loads.values()),
+            'lazy_loads': lazy_loads
+        })
+
+    return {
+        'pid': os.getpid(),
+        'rss': get_rss(),
+        'classifiers': classifiers
+    }
+
 def setup_product_classifier():
-    """Initialize the ProductClassifier as a global singleton"""
-    if not hasattr(frappe.local, 'product_classifier'):
-        frappe.local.product_classifier = ProductClassifier()
+    """Return the shared ProductClassifier, building it on first use"""
+    return get_classifier()
+
+def classify_names(product_names):
+    """Classify through the classification server when one is running, else in-process."""
+    results = classify_remote(product_names)
+    if results is None:
+        results = get_classifier().classify_many(product_names)
+    return results
 
 def classify_product(doc, method):
     """
@@ -514,41 +581,34 @@ def classify_product(doc, method):
     This function runs after a new Item is inserted or updated
     """
     try:
-        # Ensure classifier is initialized
-        setup_product_classifier()
-        
         # Get product name
         productname = doc.productname
         if not productname:
             raise ValueError("Product name is missing")
-        
-        # Classify the product
-        classification = frappe.local.product_classifier.classify_single_product(productname)
+
+        # Price-only updates keep the name, so the stored fingerprint still matches
+        fingerprint = classification_fingerprint(productname)
+        if doc.get('classification_fingerprint') == fingerprint:
+            return
+
+        # Classify the product, on the shared classification server if there is one
+        results = classify_remote([productname])
+        classification = results[0] if results else get_classifier().classify_single_product(productname)
         
         if not classification:
             raise ValueError(f"Classification failed for product: {productname}")
         
-        # Clear existing categories before adding new ones
-        doc.product_categories = []
-        
-        # If classification is successful
-        if classification['category'] != 'Unknown':
-            matched_word_sentence_case = classification['matched_word'].capitalize()
+        # Persist category, child rows and fingerprint, then mirror them on the doc
+        with stats.timer('db_write'):
+            write_classifications([(doc, classification)])
+        stats.flush()
+        category_names = get_category_names(classification)
+        doc.classification_fingerprint = fingerprint
+        doc.set('product_categories', [{'category_name': category_name} for category_name in category_names])
 
-            # Add main category
-            doc.db_set('category', matched_word_sentence_case)
-            
-            # Populate product_categories child table
-            product_categories = [
-                {"doctype": "Product Category", "category_name": classification['category']},
-                {"doctype": "Product Category", "category_name": matched_word_sentence_case}
-            ]
-            
-            # Add categories to the document
-            for category in product_categories:
-                doc.append('product_categories', category)
-            
-            frappe.db.commit()
+        # If classification is successful
+        if category_names:
+            doc.category = category_names[1]
             
             frappe.msgprint(_(f"Product classified as: {classification['category']} "
                             f"(Confidence: {classification['confidence']}, "
@@ -570,32 +630,200 @@ def classify_product(doc, method):
         frappe.log_error(error_message, "Product Classification")
         frappe.msgprint(_("Error during product classification. Check error logs."))
 
-def classify_all_products():
+def get_category_names(classification):
+    """Product Category rows for a classification: the category, then the matched word."""
+    if classification['category'] == 'Unknown':
+        return []
+    return [classification['category'], classification['matched_word'].capitalize()]
+
+def write_classifications(items):
+    """
+    Persist classifications for many Product Items with set-based writes.
+
+    ``items`` is a list of ``(row, classification)`` pairs where ``row`` has the
+    item's ``name``, ``productname``, current ``category``,
+    ``classification_fingerprint``, ``source_site`` and the size fields the
+    comparison key is built from, and its ``normalized_unit`` and
+    ``normalized_unit_price`` for the facet price bounds. Only rows whose category changed are
+    updated, and existing Product Category rows are rewritten in place so a
+    reclassify mostly issues bulk UPDATEs instead of delete/insert churn.
+    Category Facet counts are adjusted for every changed category list.
+    """
+    if not items:
+        return
+
+    names = [row.name for row, classification in items]
+    existing_rows = {}
+    for child in frappe.get_all('Product Category',
+            filters={'parenttype': 'Product Item', 'parentfield': 'product_categories', 'parent': ('in', names)},
+            fields=['name', 'parent', 'idx', 'category_name'],
+            order_by='parent asc, idx asc'):
+        existing_rows.setdefault(str(child.parent), []).append(child)
+
+    category_updates = {}
+    fingerprint_updates = {}
+    child_updates = {}
+    stale_children = []
+    facet_changes = []
+    for row, classification in items:
+        category_names = get_category_names(classification)
+        if category_names and row.category != category_names[1]:
+            category_updates[row.name] = {
+                'category': category_names[1],
+                'comparison_key': comparison_key(
+                    category_names[1], row.get('size'), row.get('unit_name'), row.get('original_unit_quantity')
+                )
+            }
+
+        fingerprint = classification_fingerprint(row.productname or '')
+        if row.get('classification_fingerprint') != fingerprint:
+            fingerprint_updates[row.name] = {'classification_fingerprint': fingerprint}
+
+        children = existing_rows.get(str(row.name), [])
+        old_category_names = [child.category_name for child in children]
+        if old_category_names != category_names:
+            price = (row.get('normalized_unit'), row.get('normalized_unit_price'))
+            facet_changes.append((row.get('source_site'), old_category_names, category_names, price, price))
+        for idx, category_name in enumerate(category_names, start=1):
+            if idx <= len(children):
+                child = children[idx - 1]
+                if child.category_name != category_name or child.idx != idx:
+                    child_updates[child.name] = {'category_name': category_name, 'idx': idx}
+            else:
+                frappe.get_doc({
+                    'doctype': 'Product Category',
+                    'parent': row.name,
+                    'parenttype': 'Product Item',
+                    'parentfield': 'product_categories',
+                    'idx': idx,
+                    'category_name': category_name
+                }).db_insert()
+        stale_children.extend(child.name for child in children[len(category_names):])
+
+    if category_updates:
+        frappe.db.bulk_update('Product Item', category_updates)
+    if fingerprint_updates:
+        # Bookkeeping only, so it must not look like a content change to clients
+        frappe.db.bulk_update('Product Item', fingerprint_updates, update_modified=False)
+    if child_updates:
+        frappe.db.bulk_update('Product Category', child_updates)
+    if stale_children:
+        frappe.db.delete('Product Category', {'name': ('in', stale_children)})
+    adjust_facet_counts(facet_changes)
+
+def classify_products(names):
+    """
+    Background job: classify the given Product Items in one batch, skipping
+    those whose fingerprint is already current.
     """
-    Classify all Product Items and clear existing categories
+    rows = frappe.get_all('Product Item',
+        filters={'name': ('in', names)},
+        fields=['name', 'productname', 'category', 'classification_fingerprint', 'source_site',
+            'size', 'unit_name', 'original_unit_quantity', 'normalized_unit', 'normalized_unit_price']
+    )
+    stale_rows = [
+        row for row in rows
+        if row.classification_fingerprint != classification_fingerprint(row.productname or '')
+    ]
+    classifications = classify_names([row.productname or '' for row in stale_rows]) if stale_rows else []
+    with stats.timer('db_write'):
+        write_classifications(list(zip(stale_rows, classifications)))
+    stats.flush(force=True)
+
+def enqueue_classification(names, chunk_size=500):
+    """Queue classify_products for ``names`` in chunks, once the current transaction commits."""
+    names = list(names)
+    for i in range(0, len(names), chunk_size):
+        frappe.enqueue(
+            'besty.frappe_product_classifier.classify_products',
+            queue='long',
+            enqueue_after_commit=True,
+            names=names[i:i + chunk_size]
+        )
+
+RECLASSIFY_CHECKPOINT_KEY = 'besty_reclassify_checkpoint'
+
+def classify_all_products(resume=True, chunk_size=500, force=False):
     """
-    # Fetch all Product Items
-    product_items = frappe.get_all('Product Item', fields=['name'])
+    Enqueue a background reclassification of every Product Item.
+    The job resumes from its last committed chunk unless ``resume`` is false,
+    and skips items whose fingerprint is current unless ``force`` is set.
+    """
+    frappe.enqueue(
+        'besty.frappe_product_classifier.reclassify_products',
+        queue='long',
+        timeout=4 * 60 * 60,
+        job_id='besty_reclassify_products',
+        deduplicate=True,
+        resume=resume,
+        chunk_size=chunk_size,
+        force=force
+    )
+    frappe.msgprint(_("Product reclassification queued"))
+
+@frappe.whitelist()
+def enqueue_reclassification(resume=True, chunk_size=500, force=False):
+    """Whitelisted entry point for classify_all_products."""
+    frappe.only_for('System Manager')
+    classify_all_products(resume=sbool(resume), chunk_size=cint(chunk_size), force=sbool(force))
+
+def reclassify_products(resume=True, chunk_size=500, force=False):
+    """
+    Background job: stream Product Items in name order, classify each chunk with
+    classify_many, write the results in bulk and commit once per chunk.
 
-    for item in product_items:
+    The last committed name is saved as a checkpoint, so a job that is killed
+    or times out picks up where it stopped on the next run.
+    """
+    classifier = get_classifier()
+
+    last_name = cint(frappe.db.get_global(RECLASSIFY_CHECKPOINT_KEY)) if resume else 0
+    total = frappe.db.count('Product Item')
+    processed = frappe.db.count('Product Item', {'name': ('<=', last_name)}) if last_name else 0
+
+    while True:
+        rows = frappe.db.sql("""
+            select name, productname, category, classification_fingerprint, source_site,
+                size, unit_name, original_unit_quantity, normalized_unit, normalized_unit_price
+            from `tabProduct Item`
+            where name > %s
+            order by name
+            limit %s
+        """, (last_name, chunk_size), as_dict=True)
+        if not rows:
+            break
+
+        stale_rows = rows if force else [
+            row for row in rows
+            if row.classification_fingerprint != classification_fingerprint(row.productname or '')
+        ]
         try:
-            doc = frappe.get_doc('Product Item', item.name)
-            
-            # Clear existing categories
-            doc.product_categories = []
-            
-            # Classify the product
-            classify_product(doc, 'on_update')
-            
-            # Save the document
-            doc.save()
-            
-            frappe.db.commit()
-            
-            frappe.msgprint(_(f"Product {doc.name} classified successfully"))
-        
+            classifications = classifier.classify_many([row.productname or '' for row in stale_rows])
+            with stats.timer('db_write'):
+                write_classifications(list(zip(stale_rows, classifications)))
         except Exception as e:
-            # Log the error
-            error_message = f"Error classifying product {item.name}: {str(e)}"
-            frappe.log_error(error_message, "Classify All Products Error")
-            frappe.msgprint(_(f"Error classifying product {item.name}. Check error logs."))
\ No newline at end of file
+            frappe.db.rollback()
+            frappe.log_error(f"Error classifying products after {last_name}: {str(e)}", "Classify All Products Error")
+            raise
+
+        last_name = rows[-1].name
+        processed += len(rows)
+        frappe.db.set_global(RECLASSIFY_CHECKPOINT_KEY, last_name)
+        with stats.timer('db_commit'):
+            frappe.db.commit()
+        stats.flush()
+
+        frappe.publish_realtime('besty_reclassify_progress', {
+            'processed': processed,
+            'total': total,
+            'last_name': last_name
+        }, user=frappe.session.user)
+
+    frappe.db.set_global(RECLASSIFY_CHECKPOINT_KEY, 0)
+    frappe.db.commit()
+    stats.flush(force=True)
+    frappe.publish_realtime('besty_reclassify_progress', {
+        'processed': processed,
+        'total': total,
+        'done': True
+    }, user=frappe.session.user)
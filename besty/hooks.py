@@ -247,7 +247,35 @@ website_route_rules = [{'from_route': '/Home/<path:app_path>', 'to_route': 'Home
 
 doc_events = {
     "Product Item": {  # Removed the typo (extra colon after "Product Item")
-        "after_insert": "besty.frappe_product_classifier.classify_product",
-        "on_update": "besty.frappe_product_classifier.classify_product"
+        "after_insert": [
+            "besty.frappe_product_classifier.classify_product",
+            "besty.price_comparison.update_comparison_key"
+        ],
+        # on_update also runs on insert, where every value counts as changed
+        "on_update": [
+            "besty.frappe_product_classifier.classify_product",
+            "besty.price_comparison.update_comparison_key",
+            "besty.search_index.index_product",
+            "besty.price_history.record_price_change",
+            "besty.category_facets.update_price_facets"
+        ],
+        "on_trash": [
+            "besty.search_index.remove_product",
+            "besty.price_history.remove_prices",
+            "besty.category_facets.remove_product_facets"
+        ]
     },
 }
+
+# Facet medians and most common units are only recomputed when a facet is
+# stale, so every facet is recomputed once a day
+scheduler_events = {
+    "daily": [
+        "besty.category_facets.mark_all_facets_stale"
+    ]
+}
+
+# Builds the shared product classifier ahead of the first Product Item write
+# when besty_warm_classifier is set in site config
+before_request = ["besty.frappe_product_classifier.warm_up_classifier"]
+before_job = ["besty.frappe_product_classifier.warm_up_classifier"]
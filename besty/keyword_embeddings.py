@@ -0,0 +1,133 @@
+# apps/besty/besty/keyword_embeddings.py
+
+import os
+import tempfile
+
+import numpy as np
+import frappe
+from frappe.utils import get_bench_path
+
+
+def get_cache_dir():
+    """Directory holding precomputed keyword embeddings, shared by all workers."""
+    return frappe.conf.get('besty_embedding_cache_dir') or os.path.join(get_bench_path(), 'besty_cache')
+
+
+class KeywordEmbeddingStore:
+    """
+    Normalized embedding matrix for the keyword vocabulary.
+
+    Row ``i`` of ``matrix`` is the unit-length embedding of ``keywords[i]``, so a
+    dot product against an encoded word is its cosine similarity.
+
+    The on-disk cache is one append-only table per model: a single ``.npz``
+    holding the matrix and the keywords of its rows, replaced in one rename so
+    a reader never pairs one writer's keywords with another's rows. Keywords
+    already in it are reused and only new ones are encoded and appended, so a
+    taxonomy edit costs an embedding per added keyword rather than a re-encode
+    of the vocabulary.
+    ``load_model`` is only called when something has to be encoded.
+    """
+
+    def __init__(self, load_model, model_name, keywords, cache_dir=None, batch_size=256):
+        self.load_model = load_model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.keywords = list(dict.fromkeys(keywords))
+        self.index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self.encoded = 0
+        self.matrix = self.load()
+
+    @property
+    def cache_path(self):
+        model_slug = self.model_name.replace('/', '--')
+        return os.path.join(self.cache_dir, f'keyword_embeddings-{model_slug}.npz')
+
+    def read_cache(self):
+        """``(keywords, matrix)`` from the cache; empty if it is missing or unreadable."""
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cache:
+                cached_keywords = cache['keywords'].tolist()
+                matrix = cache['matrix']
+        except (OSError, ValueError, KeyError):
+            return [], None
+
+        if matrix.ndim != 2 or matrix.shape[0] != len(cached_keywords):
+            return [], None
+        return cached_keywords, matrix
+
+    def load(self):
+        """Matrix for ``keywords``, encoding and caching only those not cached yet."""
+        cached_keywords, cached = self.read_cache()
+        cached_index = {keyword: i for i, keyword in enumerate(cached_keywords)}
+        missing = [keyword for keyword in self.keywords if keyword not in cached_index]
+
+        if missing:
+            encoded = self.encode(missing)
+            self.encoded = len(missing)
+            cached_keywords = cached_keywords + missing
+            cached = encoded if cached is None else np.vstack([cached, encoded])
+            cached_index.update((keyword, len(cached_index) + i) for i, keyword in enumerate(missing))
+            try:
+                self.save(cached, cached_keywords)
+            except OSError as e:
+                # A read-only bench still works, it just re-encodes on the next cold start
+                frappe.log_error(f"Could not cache keyword embeddings: {str(e)}", "Product Classification")
+
+        if cached_keywords == self.keywords:
+            return cached
+        return np.ascontiguousarray(cached[[cached_index[keyword] for keyword in self.keywords]])
+
+    def encode(self, keywords):
+        return self.load_model().encode(
+            keywords,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+
+    def save(self, matrix, keywords):
+        os.replace(self.write_temp(matrix, keywords), self.cache_path)
+
+    def write_temp(self, matrix, keywords):
+        """
+        Write keywords and matrix to a temporary file beside the cache and return
+        its path; save renames it over the cache, so concurrent writers replace
+        the table whole and the last one wins.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, keywords=np.array(keywords, dtype=str), matrix=matrix)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    def get(self, keyword):
+        return self.matrix[self.index[keyword]]
+
+    def top_k(self, embedding, k=2):
+        """
+        Return the ``k`` keywords closest to a normalized embedding as
+        ``(keyword, score)`` pairs, best first. Ties keep vocabulary order.
+        """
+        return self.top_k_many(embedding[np.newaxis, :], k)[0]
+
+    def top_k_many(self, embeddings, k=2, chunk_size=1024):
+        """Batched ``top_k`` over the rows of a 2-D array of normalized embeddings."""
+        k = min(k, len(self.keywords))
+        results = []
+        for start in range(0, len(embeddings), chunk_size):
+            scores = embeddings[start:start + chunk_size] @ self.matrix.T
+            if k < scores.shape[1]:
+                candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            for row_scores, row_candidates in zip(scores, candidates):
+                row_candidates = row_candidates[np.lexsort((row_candidates, -row_scores[row_candidates]))]
+                results.append([(self.keywords[i], float(row_scores[i])) for i in row_candidates])
+        return results
@@ -0,0 +1,141 @@
+# apps/besty/besty/keyword_index.py
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from heapq import nlargest
+
+
+class KeywordIndex:
+    """
+    Precompiled lookups for the keyword stages of ProductClassifier.
+
+    Each lookup gives the same answer as scanning the keyword table in order:
+    a word or phrase maps to the first category (in table order) that lists it,
+    and single words carry the table position of that first occurrence so the
+    earliest keyword among a product's words still wins.
+    """
+
+    def __init__(self, product_type_keywords, priority_matches):
+        self.word_ranks = {}
+        self.phrase_categories = {}
+        position = 0
+        for category, keywords in product_type_keywords.items():
+            for keyword in keywords:
+                self.word_ranks.setdefault(keyword, (position, category))
+                self.phrase_categories.setdefault(keyword, category)
+                position += 1
+
+        # A lookahead finds overlapping hits; at each position the alternation
+        # tries priorities in list order, so the lowest rank wins ties
+        self.priority_ranks = {}
+        for rank, priority in enumerate(priority_matches):
+            self.priority_ranks.setdefault(priority, rank)
+        self.priority_pattern = re.compile(
+            '(?=(' + '|'.join(re.escape(priority) for priority in priority_matches) + '))'
+        ) if priority_matches else None
+
+    def match_priority(self, text):
+        """Return the highest-priority entry that occurs as a substring of ``text``."""
+        if self.priority_pattern is None:
+            return None
+
+        best = None
+        for match in self.priority_pattern.finditer(text):
+            priority = match.group(1)
+            if best is None or self.priority_ranks[priority] < self.priority_ranks[best]:
+                best = priority
+        return best
+
+    def match_word(self, words):
+        """Return ``(keyword, category)`` for the earliest keyword in ``words``."""
+        best = None
+        for word in words:
+            rank = self.word_ranks.get(word)
+            if rank is not None and (best is None or rank[0] < best[1][0]):
+                best = (word, rank)
+        if best is None:
+            return None
+        return best[0], best[1][1]
+
+    def match_phrase(self, words):
+        """Return ``(phrase, category)`` for the first adjacent word pair that is a keyword."""
+        for i in range(len(words) - 1):
+            phrase = words[i] + ' ' + words[i + 1]
+            category = self.phrase_categories.get(phrase)
+            if category:
+                return phrase, category
+        return None
+
+
+def trigrams(word):
+    """Character trigrams of a word, padded so short words and word edges count."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram index for close-match lookups over a vocabulary.
+
+    ``close_matches`` scores candidates exactly like
+    ``difflib.get_close_matches``, but only for the ``shortlist`` entries that
+    share the most trigrams with the word and whose length allows the
+    similarity cutoff to be reached, instead of for the whole vocabulary.
+    """
+
+    def __init__(self, vocabulary, shortlist=32):
+        self.vocabulary = list(dict.fromkeys(vocabulary))
+        self.shortlist = shortlist
+        self.postings = defaultdict(list)
+        self._known = None
+        for i, entry in enumerate(self.vocabulary):
+            for trigram in trigrams(entry):
+                self.postings[trigram].append(i)
+
+    def add(self, entries):
+        """Append entries not in the vocabulary yet; lookups running meanwhile may or may not see them."""
+        if self._known is None:
+            self._known = set(self.vocabulary)
+        for entry in entries:
+            if entry in self._known:
+                continue
+            self._known.add(entry)
+            # Readers look ids up in vocabulary, so the entry goes in before its postings
+            self.vocabulary.append(entry)
+            for trigram in trigrams(entry):
+                self.postings[trigram].append(len(self.vocabulary) - 1)
+
+    def candidates(self, word, cutoff):
+        """Vocabulary ids sharing trigrams with ``word``, most shared first."""
+        counts = defaultdict(int)
+        for trigram in trigrams(word):
+            for i in self.postings.get(trigram, ()):
+                counts[i] += 1
+
+        # SequenceMatcher.ratio() can never exceed 2 * min(a, b) / (a + b)
+        length = len(word)
+        ranked = sorted(counts, key=lambda i: (-counts[i], i))
+        shortlist = []
+        for i in ranked:
+            other = len(self.vocabulary[i])
+            if 2.0 * min(length, other) / (length + other) >= cutoff:
+                shortlist.append(i)
+                if len(shortlist) == self.shortlist:
+                    break
+        return shortlist
+
+    def close_matches(self, word, n=1, cutoff=0.8):
+        """Drop-in replacement for ``get_close_matches(word, vocabulary, n, cutoff)``."""
+        if not word:
+            return []
+
+        result = []
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for i in self.candidates(word, cutoff):
+            entry = self.vocabulary[i]
+            matcher.set_seq1(entry)
+            if matcher.quick_ratio() >= cutoff and matcher.ratio() >= cutoff:
+                result.append((matcher.ratio(), entry))
+        return [entry for score, entry in nlargest(n, result)]
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    # Catalog sync reads deleted Product Items by doctype and deletion time
+    frappe.db.add_index('Deleted Document', ['deleted_doctype', 'creation'])
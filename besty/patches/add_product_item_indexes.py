@@ -0,0 +1,64 @@
+import frappe
+
+from besty.besty.doctype.product_item.product_item import (
+    COMPOSITE_INDEXES,
+    UNIQUE_KEY,
+    UNIQUE_KEY_NAME,
+    has_duplicate_products
+)
+from besty.price_history import record_prices
+
+# Tables whose Link to Product Item must follow a merged duplicate; Product
+# Price names are derived from the product, so its rows are re-recorded instead
+PRODUCT_LINKS = (('Shopping Item', 'product'),)
+
+
+def execute():
+    # Scraper upserts, last_updated listings and category filters get indexes; duplicate
+    # (source_site, product_id) rows are merged into the oldest one before the unique key
+    frappe.db.sql("update `tabProduct Item` set product_id = null where product_id = ''")
+    if has_duplicate_products():
+        merge_duplicate_products()
+
+    for fields in COMPOSITE_INDEXES:
+        frappe.db.add_index('Product Item', fields)
+    if not frappe.db.has_index('tabProduct Item', UNIQUE_KEY_NAME):
+        frappe.db.add_unique('Product Item', UNIQUE_KEY, constraint_name=UNIQUE_KEY_NAME)
+
+
+def merge_duplicate_products():
+    rows = frappe.db.sql("""
+        select item.source_site, item.product_id, item.name
+        from `tabProduct Item` item
+        join (
+            select source_site, product_id
+            from `tabProduct Item`
+            where product_id is not null
+            group by source_site, product_id
+            having count(*) > 1
+        ) duplicate on duplicate.source_site <=> item.source_site and duplicate.product_id = item.product_id
+        order by item.source_site, item.product_id, item.creation, item.name
+    """)
+    groups = {}
+    for source_site, product_id, name in rows:
+        groups.setdefault((source_site, product_id), []).append(name)
+
+    for keep, *duplicates in groups.values():
+        for doctype, fieldname in PRODUCT_LINKS:
+            frappe.db.sql(f"""
+                update `tab{doctype}` set `{fieldname}` = %s where `{fieldname}` in %s
+            """, (keep, tuple(duplicates)))
+        move_prices(keep, duplicates)
+        for name in duplicates:
+            # Runs the on_trash hooks, so search tokens and category facets follow
+            frappe.delete_doc('Product Item', name, force=True, ignore_permissions=True)
+        frappe.db.commit()
+
+
+def move_prices(keep, duplicates):
+    """Re-record the duplicates' price history under the kept item; observations it already has are skipped."""
+    observations = frappe.db.sql("""
+        select price, observed_at from `tabProduct Price` where product in %s
+    """, (tuple(duplicates),))
+    frappe.db.delete('Product Price', {'product': ('in', duplicates)})
+    record_prices([(keep, price, observed_at) for price, observed_at in observations])
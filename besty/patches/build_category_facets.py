@@ -0,0 +1,6 @@
+from besty.category_facets import rebuild_category_facets
+
+
+def execute():
+    # Facets for the existing catalog come from one background rebuild
+    rebuild_category_facets()
@@ -0,0 +1,6 @@
+from besty.price_comparison import rebuild_comparison_keys
+
+
+def execute():
+    # Existing products get their comparison keys from a background rebuild
+    rebuild_comparison_keys(resume=False)
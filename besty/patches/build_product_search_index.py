@@ -0,0 +1,6 @@
+from besty.search_index import rebuild_search_index
+
+
+def execute():
+    # Existing products only reach the index through a rebuild
+    rebuild_search_index(resume=False)
@@ -0,0 +1,6 @@
+from besty.price_comparison import rebuild_unit_prices
+
+
+def execute():
+    # Existing products get their normalized unit prices from a background rebuild
+    rebuild_unit_prices(resume=False)
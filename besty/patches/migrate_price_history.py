@@ -0,0 +1,5 @@
+from besty.price_history import migrate_price_history
+
+
+def execute():
+    migrate_price_history()
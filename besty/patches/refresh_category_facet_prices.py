@@ -0,0 +1,6 @@
+from besty.category_facets import mark_all_facets_stale
+
+
+def execute():
+    # Existing facets get their new max_unit_price from one background refresh
+    mark_all_facets_stale()
@@ -0,0 +1,212 @@
+# apps/besty/besty/price_comparison.py
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from besty.category_facets import mark_facets_stale
+from besty.unit_normalization import normalize_size, normalized_unit_prices, size_label
+
+COMPARISON_FIELDS = [
+    'name', 'productname', 'source_site', 'size', 'image_url', 'current_price',
+    'unit_price', 'unit_name', 'comparison_key', 'normalized_unit', 'normalized_unit_price'
+]
+
+REBUILD_CHECKPOINT_KEY = 'besty_comparison_key_checkpoint'
+UNIT_PRICE_CHECKPOINT_KEY = 'besty_unit_price_checkpoint'
+
+STANDARD_UNIT_ORDER = ('kg', 'L', 'ea')
+
+
+def comparison_key(category, size, unit_name=None, original_unit_quantity=None):
+    """
+    Equivalence group of a Product Item: its classified product type plus its
+    normalized size, e.g. ``milk|2000ml``. None when either is unknown.
+    """
+    normalized = normalize_size(size, unit_name, original_unit_quantity)
+    if not category or not normalized:
+        return None
+    return f'{category.strip().lower()}|{size_label(*normalized)}'[:140]
+
+
+def row_comparison_key(row):
+    return comparison_key(row.get('category'), row.get('size'), row.get('unit_name'), row.get('original_unit_quantity'))
+
+
+def update_comparison_key(doc, method=None):
+    """Product Item after_insert/on_update hook; runs after classify_product sets the category."""
+    key = row_comparison_key(doc)
+    if doc.get('comparison_key') != key:
+        frappe.db.set_value('Product Item', doc.name, 'comparison_key', key, update_modified=False)
+        doc.comparison_key = key
+
+
+def get_comparisons(names):
+    """
+    Cheapest offer per source_site for each Product Item in ``names``, by
+    normalized unit price.
+
+    Equivalent products share a comparison key, so this is one indexed lookup
+    for the whole batch. Returns ``{name: [offers by unit price]}``.
+    """
+    names = [cint(name) for name in names if name]
+    if not names:
+        return {}
+
+    keys = {
+        item.name: item.comparison_key
+        for item in frappe.get_all('Product Item', filters={'name': ('in', names)}, fields=['name', 'comparison_key'])
+    }
+    groups = {}
+    if any(keys.values()):
+        for row in frappe.get_all('Product Item',
+                filters={'comparison_key': ('in', list({key for key in keys.values() if key}))},
+                fields=COMPARISON_FIELDS,
+                order_by='normalized_unit_price asc, current_price asc',
+                limit_page_length=0):
+            groups.setdefault(row.comparison_key, []).append(row)
+
+    return {name: best_offers(groups.get(keys.get(name), [])) for name in names}
+
+
+def best_offers(rows):
+    """First (cheapest) row per source_site, keeping unit-price order."""
+    offers = {}
+    for row in rows:
+        offers.setdefault(row.source_site, {
+            'site': row.source_site,
+            'product': row.name,
+            'productname': row.productname,
+            'size': row.size,
+            'image_url': row.image_url,
+            'price': row.current_price,
+            'unit_price': row.unit_price,
+            'unit_name': row.unit_name,
+            'normalized_unit': row.normalized_unit,
+            'normalized_unit_price': row.normalized_unit_price,
+            'total_price': row.current_price
+        })
+    return list(offers.values())
+
+
+def rebuild_comparison_keys(resume=True, chunk_size=2000):
+    """Enqueue a background recomputation of every Product Item comparison key."""
+    frappe.enqueue(
+        'besty.price_comparison.recompute_comparison_keys',
+        queue='long',
+        timeout=4 * 60 * 60,
+        job_id='besty_recompute_comparison_keys',
+        deduplicate=True,
+        resume=resume,
+        chunk_size=chunk_size
+    )
+    frappe.msgprint(_("Comparison key rebuild queued"))
+
+def recompute_comparison_keys(resume=True, chunk_size=2000):
+    """
+    Background job: recompute comparison keys in name order, writing only the
+    ones that changed and committing once per chunk.
+    """
+    last_name = cint(frappe.db.get_global(REBUILD_CHECKPOINT_KEY)) if resume else 0
+
+    while True:
+        rows = frappe.db.sql("""
+            select name, category, size, unit_name, original_unit_quantity, comparison_key
+            from `tabProduct Item`
+            where name > %s
+            order by name
+            limit %s
+        """, (last_name, chunk_size), as_dict=True)
+        if not rows:
+            break
+
+        updates = {}
+        for row in rows:
+            key = row_comparison_key(row)
+            if row.comparison_key != key:
+                updates[row.name] = {'comparison_key': key}
+        if updates:
+            frappe.db.bulk_update('Product Item', updates, update_modified=False)
+
+        last_name = rows[-1].name
+        frappe.db.set_global(REBUILD_CHECKPOINT_KEY, last_name)
+        frappe.db.commit()
+
+    frappe.db.set_global(REBUILD_CHECKPOINT_KEY, 0)
+    frappe.db.commit()
+
+
+def get_cheapest_in_category(category, normalized_unit=None, source_site=None, limit=10):
+    """
+    Cheapest Product Items of a category by price per kg, L or each, as
+    ``{normalized_unit: [rows]}``. Each unit is one range scan on the
+    (category, normalized_unit, normalized_unit_price) index.
+    """
+    units = [normalized_unit] if normalized_unit else STANDARD_UNIT_ORDER
+    filters = {'category': category, 'normalized_unit_price': ('>', 0)}
+    if source_site:
+        filters['source_site'] = source_site
+
+    cheapest = {}
+    for unit in units:
+        rows = frappe.get_list('Product Item',
+            fields=COMPARISON_FIELDS,
+            filters={**filters, 'normalized_unit': unit},
+            order_by='normalized_unit_price asc',
+            limit_page_length=limit
+        )
+        if rows:
+            cheapest[unit] = rows
+    return cheapest
+
+
+def rebuild_unit_prices(resume=True, chunk_size=5000):
+    """Enqueue a background recomputation of every Product Item's normalized unit price."""
+    frappe.enqueue(
+        'besty.price_comparison.recompute_unit_prices',
+        queue='long',
+        timeout=4 * 60 * 60,
+        job_id='besty_recompute_unit_prices',
+        deduplicate=True,
+        resume=resume,
+        chunk_size=chunk_size
+    )
+    frappe.msgprint(_("Unit price rebuild queued"))
+
+def recompute_unit_prices(resume=True, chunk_size=5000):
+    """
+    Background job: normalize unit prices a chunk at a time in name order,
+    writing only the rows that changed and committing once per chunk.
+    """
+    last_name = cint(frappe.db.get_global(UNIT_PRICE_CHECKPOINT_KEY)) if resume else 0
+
+    while True:
+        rows = frappe.db.sql("""
+            select name, current_price, size, unit_name, original_unit_quantity,
+                normalized_unit, normalized_unit_price
+            from `tabProduct Item`
+            where name > %s
+            order by name
+            limit %s
+        """, (last_name, chunk_size), as_dict=True)
+        if not rows:
+            break
+
+        updates = {}
+        unit_prices = normalized_unit_prices([
+            (row.current_price, row.size, row.unit_name, row.original_unit_quantity) for row in rows
+        ])
+        for row, (unit, unit_price) in zip(rows, unit_prices):
+            if row.normalized_unit != unit or flt(row.normalized_unit_price, 4) != flt(unit_price, 4):
+                updates[row.name] = {'normalized_unit': unit, 'normalized_unit_price': unit_price}
+        if updates:
+            # Unit prices are synced to clients, so these count as content changes
+            frappe.db.bulk_update('Product Item', updates)
+            mark_facets_stale(updates)
+
+        last_name = rows[-1].name
+        frappe.db.set_global(UNIT_PRICE_CHECKPOINT_KEY, last_name)
+        frappe.db.commit()
+
+    frappe.db.set_global(UNIT_PRICE_CHECKPOINT_KEY, 0)
+    frappe.db.commit()
@@ -0,0 +1,130 @@
+# apps/besty/besty/price_history.py
+
+import hashlib
+import json
+import re
+from datetime import datetime
+
+import frappe
+from frappe.utils import cint, flt, get_datetime, now_datetime
+
+MIGRATION_CHECKPOINT_KEY = 'besty_price_history_migration_checkpoint'
+
+# Keys scrapers have used for the timestamp of a price_history entry
+DATE_KEYS = ('observed_at', 'date', 'timestamp', 'time', 'datetime', 'checked', 'updated')
+LINE_PATTERN = re.compile(r'^\s*(\S.*?)\s*[,:;=|\t]\s*\$?\s*(\d+(?:\.\d+)?)\s*$')
+
+
+def price_name(product, price, observed_at):
+    """
+    Deterministic name, so bulk inserts never collide on random names and a
+    repeated observation is skipped instead of stored twice.
+    """
+    return hashlib.sha1(f'{product}|{get_datetime(observed_at)}|{flt(price)}'.encode('utf-8')).hexdigest()[:20]
+
+
+def price_row(product, price, observed_at=None):
+    observed_at = get_datetime(observed_at or now_datetime())
+    return (price_name(product, price, observed_at), product, flt(price), observed_at)
+
+
+def record_price(product, price, observed_at=None):
+    """Append one price observation; a single INSERT."""
+    record_prices([(product, price, observed_at)])
+
+
+def record_prices(observations):
+    """
+    Append many ``(product, price, observed_at)`` observations in one bulk
+    INSERT; ones already recorded are ignored.
+    """
+    rows = [price_row(*observation) for observation in observations]
+    if rows:
+        frappe.db.bulk_insert('Product Price', ['name', 'product', 'price', 'observed_at'], rows,
+            ignore_duplicates=True)
+
+
+def record_price_change(doc, method=None):
+    """Product Item on_update hook (also runs on insert): log the price when it is new or changed."""
+    if not doc.has_value_changed('current_price'):
+        return
+    record_price(doc.name, doc.current_price, doc.get('last_updated') or doc.get('last_checked'))
+
+
+def remove_prices(doc, method=None):
+    """Product Item on_trash hook."""
+    frappe.db.delete('Product Price', {'product': doc.name})
+
+
+def parse_price_history(blob):
+    """
+    Read the legacy ``price_history`` text into ``[(observed_at, price)]``.
+
+    Accepts the shapes found in scraped data: a JSON list of objects or of
+    ``[date, price]`` pairs, a JSON object mapping dates to prices, or one
+    ``date, price`` entry per line. Unreadable entries are skipped.
+    """
+    if not blob or not blob.strip():
+        return []
+
+    try:
+        data = json.loads(blob)
+    except ValueError:
+        data = [match.groups() for match in map(LINE_PATTERN.match, blob.splitlines()) if match]
+
+    if isinstance(data, dict):
+        data = list(data.items())
+    if not isinstance(data, list):
+        return []
+
+    observations = []
+    for entry in data:
+        if isinstance(entry, dict):
+            observed_at = next((entry[key] for key in DATE_KEYS if entry.get(key)), None)
+            price = entry.get('price')
+        elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+            observed_at, price = entry
+        else:
+            continue
+        if not observed_at:
+            continue
+
+        try:
+            if isinstance(observed_at, (int, float)):
+                # Epoch seconds, or milliseconds from JavaScript scrapers
+                observed_at = datetime.fromtimestamp(observed_at / 1000 if observed_at > 1e11 else observed_at)
+            observations.append((get_datetime(observed_at), flt(price)))
+        except Exception:
+            continue
+    return [(observed_at, price) for observed_at, price in observations if price > 0]
+
+
+def migrate_price_history(chunk_size=1000):
+    """
+    Copy every Product Item's price_history blob into Product Price rows,
+    committing per chunk with a checkpoint so a rerun continues, not duplicates.
+    """
+    last_name = cint(frappe.db.get_global(MIGRATION_CHECKPOINT_KEY))
+
+    while True:
+        rows = frappe.db.sql("""
+            select name, price_history, current_price, last_updated
+            from `tabProduct Item`
+            where name > %s
+            order by name
+            limit %s
+        """, (last_name, chunk_size), as_dict=True)
+        if not rows:
+            break
+
+        observations = []
+        for row in rows:
+            # Items without a readable history start from their current price
+            history = parse_price_history(row.price_history) or (
+                [(row.last_updated, row.current_price)] if flt(row.current_price) > 0 else []
+            )
+            observations.extend((row.name, price, observed_at) for observed_at, price in history)
+        record_prices(observations)
+        last_name = rows[-1].name
+        frappe.db.set_global(MIGRATION_CHECKPOINT_KEY, last_name)
+        frappe.db.commit()
@@ -0,0 +1,303 @@
+# apps/besty/besty/search_index.py
+
+import re
+import threading
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, sbool
+
+from besty.keyword_index import TrigramIndex
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+FUZZY_CUTOFF = 0.8
+FUZZY_EXPANSIONS = 3
+
+# Relevance of a query term hitting a product token
+EXACT_WEIGHT = 3
+PREFIX_WEIGHT = 2
+FUZZY_WEIGHT = 1
+
+# Sort orders as (expression, direction) pairs; sort_keys adds the unique name
+SORT_KEYS = {
+    'relevance': [('m.score', 'desc'), ('p.last_updated', 'desc')],
+    'last_updated': [('p.last_updated', 'desc')],
+    'price': [('p.current_price', 'asc')],
+    'unit_price': [('p.unit_price', 'asc')],
+    'name': [('p.productname', 'asc')],
+}
+
+REBUILD_CHECKPOINT_KEY = 'besty_search_index_checkpoint'
+
+# Distinct tokens back typo expansion. Each process reloads them every
+# VOCABULARY_TTL seconds in a background thread and swaps the finished index
+# in; its own index_products calls add new tokens in between.
+VOCABULARY_TTL = 10 * 60
+_vocabulary = {'index': None, 'loaded_at': 0.0, 'refreshing': False}
+_vocabulary_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Distinct lowercase word tokens of ``text``, in order; apostrophes are dropped."""
+    text = (text or '').lower().replace("'", '').replace('’', '')
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(text)))
+
+
+def token_rows(product, productname):
+    return [(f'{product}-{i}', product, token[:140]) for i, token in enumerate(tokenize(productname))]
+
+
+def index_product(doc, method=None):
+    """Product Item on_update hook (also runs on insert): reindex when the name changed."""
+    if not doc.has_value_changed('productname'):
+        return
+    index_products([(doc.name, doc.productname)])
+
+
+def remove_product(doc, method=None):
+    """Product Item on_trash hook."""
+    frappe.db.delete('Product Search Token', {'product': doc.name})
+
+
+def index_products(products):
+    """Replace the tokens of ``(name, productname)`` pairs in two bulk statements."""
+    if not products:
+        return
+
+    frappe.db.delete('Product Search Token', {'product': ('in', [name for name, productname in products])})
+    rows = [row for name, productname in products for row in token_rows(name, productname)]
+    if rows:
+        frappe.db.bulk_insert('Product Search Token', ['name', 'product', 'token'], rows)
+        with _vocabulary_lock:
+            if _vocabulary['index'] is not None:
+                _vocabulary['index'].add(token for name, product, token in rows)
+
+
+def rebuild_search_index(resume=True, chunk_size=2000):
+    """Enqueue a background rebuild of the product search index."""
+    frappe.enqueue(
+        'besty.search_index.reindex_products',
+        queue='long',
+        timeout=4 * 60 * 60,
+        job_id='besty_reindex_products',
+        deduplicate=True,
+        resume=resume,
+        chunk_size=chunk_size
+    )
+    frappe.msgprint(_("Product search index rebuild queued"))
+
+@frappe.whitelist()
+def enqueue_search_index_rebuild(resume=True, chunk_size=2000):
+    """Whitelisted entry point for rebuild_search_index."""
+    frappe.only_for('System Manager')
+    rebuild_search_index(resume=sbool(resume), chunk_size=cint(chunk_size))
+
+def reindex_products(resume=True, chunk_size=2000):
+    """
+    Background job: retokenize Product Items in name order, committing once per
+    chunk and saving the last committed name so an interrupted run resumes.
+    """
+    last_name = cint(frappe.db.get_global(REBUILD_CHECKPOINT_KEY)) if resume else 0
+
+    while True:
+        rows = frappe.db.sql("""
+            select name, productname
+            from `tabProduct Item`
+            where name > %s
+            order by name
+            limit %s
+        """, (last_name, chunk_size))
+        if not rows:
+            break
+
+        index_products(rows)
+        last_name = rows[-1][0]
+        frappe.db.set_global(REBUILD_CHECKPOINT_KEY, last_name)
+        frappe.db.commit()
+
+    # Tokens of products deleted without the on_trash hook running
+    frappe.db.sql("""
+        delete t from `tabProduct Search Token` t
+        left join `tabProduct Item` p on p.name = t.product
+        where p.name is null
+    """)
+    frappe.db.set_global(REBUILD_CHECKPOINT_KEY, 0)
+    frappe.db.commit()
+
+    # Tokens of deleted products drop out on the next vocabulary refresh
+    _vocabulary['loaded_at'] = 0.0
+
+
+def get_vocabulary_index():
+    """
+    This process's vocabulary index, or None until the first load finishes.
+    A missing or expired index is reloaded in a background thread, never
+    within the calling request.
+    """
+    index = _vocabulary['index']
+    if index is None or time.monotonic() - _vocabulary['loaded_at'] > VOCABULARY_TTL:
+        with _vocabulary_lock:
+            if _vocabulary['refreshing']:
+                return index
+            _vocabulary['refreshing'] = True
+        threading.Thread(target=refresh_vocabulary_index, args=(frappe.local.site,), daemon=True).start()
+    return index
+
+
+def refresh_vocabulary_index(site):
+    """Background thread body: load_vocabulary_index on a connection of its own."""
+    try:
+        frappe.init(site=site)
+        try:
+            frappe.connect()
+            load_vocabulary_index()
+        finally:
+            frappe.destroy()
+    finally:
+        with _vocabulary_lock:
+            _vocabulary['refreshing'] = False
+
+
+def load_vocabulary_index():
+    """Build an index of the distinct tokens and swap it in for this process."""
+    index = TrigramIndex(frappe.db.sql_list('select distinct token from `tabProduct Search Token`'))
+    with _vocabulary_lock:
+        _vocabulary['index'] = index
+        _vocabulary['loaded_at'] = time.monotonic()
+    return index
+
+
+def expand_term(term):
+    """Tokens a query term should match: itself, as a prefix, and close misspellings."""
+    fuzzy = []
+    index = get_vocabulary_index() if len(term) >= MIN_FUZZY_LENGTH else None
+    if index is not None:
+        fuzzy = [
+            token for token in index.close_matches(term, n=FUZZY_EXPANSIONS, cutoff=FUZZY_CUTOFF)
+            if token != term
+        ]
+    return {
+        'exact': term,
+        # Terms come from tokenize, so they never carry LIKE wildcards
+        'prefix': term + '%' if len(term) >= MIN_PREFIX_LENGTH else None,
+        'fuzzy': fuzzy
+    }
+
+
+def search(query, filters=None, order='relevance', start=0, page_length=20, after=None):
+    """
+    Ranked product search over the token index.
+
+    Every query term must match a token of the product name exactly, as a
+    prefix or as a close misspelling; exact hits outrank prefix hits, which
+    outrank fuzzy ones. ``after`` is the sort key of the last row of the
+    previous page (see keyset_condition); ``start`` is a plain offset, kept
+    for old clients. Returns ``(product names, total matches, sort keys)``.
+    """
+    terms = tokenize(query)[:8]
+    if not terms:
+        return [], 0, []
+    if order not in SORT_KEYS:
+        frappe.throw(_("Unsupported sort order: {0}").format(order))
+
+    values = {'start': cint(start), 'page_length': cint(page_length)}
+    token_conditions = []
+    term_scores = []
+    for i, term in enumerate(terms):
+        expansion = expand_term(term)
+        values[f'exact_{i}'] = expansion['exact']
+        cases = [f'when t.token = %(exact_{i})s then {EXACT_WEIGHT}']
+        conditions = [f't.token = %(exact_{i})s']
+        if expansion['prefix']:
+            values[f'prefix_{i}'] = expansion['prefix']
+            cases.append(f'when t.token like %(prefix_{i})s then {PREFIX_WEIGHT}')
+            conditions.append(f't.token like %(prefix_{i})s')
+        if expansion['fuzzy']:
+            values[f'fuzzy_{i}'] = tuple(expansion['fuzzy'])
+            cases.append(f'when t.token in %(fuzzy_{i})s then {FUZZY_WEIGHT}')
+            conditions.append(f't.token in %(fuzzy_{i})s')
+        token_conditions.extend(conditions)
+        term_scores.append(f"max(case {' '.join(cases)} end)")
+
+    product_conditions = get_product_conditions(filters or {}, values)
+
+    # The sort key is selected as k0, k1, ... so the page can filter on it after
+    # the total is counted over every match
+    keys = sort_keys(order)
+    ranked_keys = [(f'k{i}', direction) for i, (expression, direction) in enumerate(keys)]
+    after_condition = f'where {keyset_condition(ranked_keys, after, values)}' if after else ''
+
+    # Each term's best hit per product; a product matches when every term hit
+    rows = frappe.db.sql(f"""
+        select *
+        from (
+            select m.product, {', '.join(f'{expression} as k{i}' for i, (expression, direction) in enumerate(keys))},
+                count(*) over () as total
+            from (
+                select t.product, {' + '.join(term_scores)} as score
+                from `tabProduct Search Token` t
+                join `tabProduct Item` p on p.name = t.product
+                where ({' or '.join(token_conditions)}) {product_conditions}
+                group by t.product
+                having {' and '.join(f'{score} is not null' for score in term_scores)}
+            ) m
+            join `tabProduct Item` p on p.name = m.product
+        ) ranked
+        {after_condition}
+        order by {order_clause(ranked_keys)}
+        limit %(start)s, %(page_length)s
+    """, values, as_dict=True)
+
+    return (
+        [row.product for row in rows],
+        rows[0].total if rows else 0,
+        [[row[f'k{i}'] for i in range(len(keys))] for row in rows]
+    )
+
+
+def sort_keys(order):
+    """``(expression, direction)`` pairs for a sort order, ending with the unique product name."""
+    return SORT_KEYS[order] + [('p.name', 'desc')]
+
+
+def order_clause(keys):
+    return ', '.join(f'{expression} {direction}' for expression, direction in keys)
+
+
+def keyset_condition(keys, after, values):
+    """
+    SQL condition for the rows that sort after ``after``, the previous page's
+    last values of ``keys``, so a page never re-reads the rows before it.
+    NULLs sort first ascending and last descending, as in MariaDB.
+    """
+    clauses = []
+    for i, (expression, direction) in enumerate(keys):
+        values[f'after_{i}'] = after[i]
+        if after[i] is None:
+            later = f'{expression} is not null' if direction == 'asc' else None
+        elif direction == 'asc':
+            later = f'{expression} > %(after_{i})s'
+        else:
+            later = f'({expression} < %(after_{i})s or {expression} is null)'
+        if later:
+            equal = [f'{keys[j][0]} <=> %(after_{j})s' for j in range(i)]
+            clauses.append(f"({' and '.join(equal + [later])})")
+    return f"({' or '.join(clauses)})" if clauses else '0'
+
+
+def get_product_conditions(filters, values):
+    conditions = []
+    for field in ('source_site', 'category'):
+        if filters.get(field):
+            values[field] = filters[field]
+            conditions.append(f'p.{field} = %({field})s')
+    if filters.get('min_price') not in (None, ''):
+        values['min_price'] = flt(filters['min_price'])
+        conditions.append('p.current_price >= %(min_price)s')
+    if filters.get('max_price') not in (None, ''):
+        values['max_price'] = flt(filters['max_price'])
+        conditions.append('p.current_price <= %(max_price)s')
+    return ''.join(f' and {condition}' for condition in conditions)
@@ -0,0 +1,116 @@
+# apps/besty/besty/taxonomy.py
+
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+
+import frappe
+
+from besty.keyword_index import KeywordIndex, TrigramIndex
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(__file__), 'classifier_taxonomy.json')
+
+
+class Taxonomy:
+    """
+    The classifier's word lists compiled into read-only lookups.
+
+    Built once per taxonomy file version and shared by every classifier in the
+    process: keyword tables become tuples and mapping proxies, and the plural
+    forms, keyword index and fuzzy index are derived here instead of in each
+    ProductClassifier.
+    """
+
+    def __init__(self, data, source=None):
+        self.source = source
+        self.data_version = data.get('version')
+        self.ignore_words = frozenset(data['ignore_words'])
+        self.priority_category = data['priority_category']
+        self.priority_matches = tuple(data['priority_matches'])
+        self.descriptive_words = frozenset(data['descriptive_words'])
+        self.whitelist = frozenset(data['whitelist'])
+        self.product_type_keywords = MappingProxyType({
+            category: tuple(keywords) for category, keywords in data['product_type_keywords'].items()
+        })
+
+        # Hash of every word list that affects classification results
+        payload = json.dumps([
+            {category: list(keywords) for category, keywords in self.product_type_keywords.items()},
+            sorted(self.ignore_words),
+            list(self.priority_matches),
+            sorted(self.descriptive_words),
+            sorted(self.whitelist)
+        ], ensure_ascii=False, separators=(',', ':'))
+        self.version = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+        # Reverse mapping with plural forms for keywords
+        keyword_to_category = {}
+        for category, keywords in self.product_type_keywords.items():
+            for keyword in keywords:
+                keyword_to_category[keyword] = category
+                keyword_to_category[keyword + 's'] = category
+                if keyword.endswith('y'):
+                    keyword_to_category[keyword[:-1] + 'ies'] = category
+                elif keyword.endswith('f'):
+                    keyword_to_category[keyword[:-1] + 'ves'] = category
+        self.keyword_to_category = MappingProxyType(keyword_to_category)
+
+        self.keyword_index = KeywordIndex(self.product_type_keywords, self.priority_matches)
+        self.keywords = tuple(dict.fromkeys(
+            keyword for keywords in self.product_type_keywords.values() for keyword in keywords
+        ))
+        self.fuzzy_index = TrigramIndex(self.keywords)
+
+
+def get_taxonomy_path():
+    """Site config ``besty_taxonomy_path`` lets a site use its own copy of the taxonomy."""
+    try:
+        path = frappe.conf.get('besty_taxonomy_path')
+    except (AttributeError, RuntimeError):
+        # Outside a site context (benchmarks, background rebuild threads)
+        path = None
+    return path or DEFAULT_TAXONOMY_PATH
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def load_taxonomy(path):
+    with open(path, encoding='utf-8') as f:
+        return Taxonomy(json.load(f), source=path)
+
+
+# The compiled taxonomy, recompiled only when its file changes
+_taxonomy = None
+_taxonomy_signature = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """The current compiled taxonomy, compiling it on first use."""
+    if _taxonomy is None:
+        refresh_taxonomy()
+    return _taxonomy
+
+
+def refresh_taxonomy():
+    """
+    Recompile the taxonomy if its file changed since it was last read.
+    Returns True when a new taxonomy was loaded.
+    """
+    global _taxonomy, _taxonomy_signature
+    signature = file_signature(get_taxonomy_path())
+    if signature == _taxonomy_signature:
+        return False
+
+    with _taxonomy_lock:
+        if signature == _taxonomy_signature:
+            return False
+        taxonomy = load_taxonomy(signature[0])
+        changed = _taxonomy is None or taxonomy.version != _taxonomy.version
+        _taxonomy, _taxonomy_signature = taxonomy, signature
+        return changed
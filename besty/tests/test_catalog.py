@@ -0,0 +1,37 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime, now_datetime
+
+from besty.api.catalog import (
+    MAX_WATERMARK_AGE_DAYS, decode_cursor, encode_cursor, get_catalog_version, is_replayable
+)
+
+
+class TestCatalog(FrappeTestCase):
+    def test_cursor_round_trip(self):
+        started = get_datetime('2026-10-18 09:30:00.250000')
+        modified = get_datetime('2026-10-18 09:29:59.000001')
+        cursor = encode_cursor('delta', started, (modified, 1042))
+        self.assertEqual(decode_cursor(cursor), ('delta', started, (modified, 1042)))
+        self.assertEqual(decode_cursor(encode_cursor('snapshot', started, (None, 7)))[2], (None, 7))
+
+    def test_old_watermarks_get_a_snapshot(self):
+        self.assertTrue(is_replayable(str(add_to_date(now_datetime(), days=-1))))
+        self.assertFalse(is_replayable(str(add_to_date(now_datetime(), days=-MAX_WATERMARK_AGE_DAYS - 1))))
+        self.assertFalse(is_replayable('not a date'))
+
+    def test_version_follows_latest_change_and_deletion_without_counting(self):
+        db = MagicMock()
+        with patch.object(frappe, 'db', db, create=True):
+            db.sql.return_value = [('2026-10-18 09:30:00', '2026-10-18 08:00:00')]
+            version = get_catalog_version()
+            self.assertNotIn('count(', db.sql.call_args[0][0])
+            self.assertEqual(get_catalog_version(), version)
+
+            db.sql.return_value = [('2026-10-18 09:30:00', '2026-10-18 09:31:00')]
+            self.assertNotEqual(get_catalog_version(), version)
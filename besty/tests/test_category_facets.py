@@ -0,0 +1,61 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from besty.category_facets import ALL_SITES, bound_updates, facet_deltas, facet_name, price_moves
+
+
+class TestCategoryFacets(FrappeTestCase):
+    def test_new_classification_counts_for_shop_and_all_shops(self):
+        deltas, parents = facet_deltas([('paknsave.co.nz', [], ['Dairy & Eggs', 'Milk'])])
+        self.assertEqual(deltas, {
+            ('Dairy & Eggs', 1, 'paknsave.co.nz'): 1,
+            ('Dairy & Eggs', 1, ALL_SITES): 1,
+            ('Milk', 2, 'paknsave.co.nz'): 1,
+            ('Milk', 2, ALL_SITES): 1,
+        })
+        self.assertEqual(parents[('Milk', 2, ALL_SITES)], 'Dairy & Eggs')
+
+    def test_reclassification_moves_counts(self):
+        deltas, parents = facet_deltas([
+            ('woolworths.co.nz', ['Pantry Items', 'Pesto'], ['Fruit & Vegetables', 'Broccoli']),
+            ('paknsave.co.nz', ['Pantry Items', 'Pesto'], ['Pantry Items', 'Pesto']),
+        ])
+        self.assertEqual(deltas[('Pantry Items', 1, ALL_SITES)], -1)
+        self.assertEqual(deltas[('Pesto', 2, 'woolworths.co.nz')], -1)
+        self.assertEqual(deltas[('Broccoli', 2, ALL_SITES)], 1)
+        self.assertNotIn(('Pantry Items', 1, 'paknsave.co.nz'), deltas)
+
+    def test_facet_names_are_stable(self):
+        self.assertEqual(facet_name('Milk', 2, ''), facet_name('Milk', 2, ''))
+        self.assertNotEqual(facet_name('Milk', 2, ''), facet_name('Milk', 2, 'paknsave.co.nz'))
+
+
+    def test_price_change_moves_price_within_the_same_facets(self):
+        moves = price_moves([
+            ('paknsave.co.nz', ['Dairy & Eggs', 'Milk'], ['Dairy & Eggs', 'Milk'], ('L', 2.5), ('L', 2.2))
+        ])
+        self.assertEqual(moves[('Milk', 2, ALL_SITES)], ([('L', 2.5)], [('L', 2.2)]))
+        self.assertEqual(len(moves), 4)
+
+    def test_reclassification_moves_price_between_facets(self):
+        moves = price_moves([
+            ('paknsave.co.nz', ['Pantry Items', 'Pesto'], ['Pantry Items', 'Pasta Sauce'], ('kg', 20), ('kg', 20))
+        ])
+        self.assertEqual(moves[('Pesto', 2, 'paknsave.co.nz')], ([('kg', 20)], []))
+        self.assertEqual(moves[('Pasta Sauce', 2, ALL_SITES)], ([], [('kg', 20)]))
+        self.assertNotIn(('Pantry Items', 1, ALL_SITES), moves)
+
+    def test_only_removing_a_bound_needs_a_recompute(self):
+        facet = frappe._dict(normalized_unit='L', min_unit_price=1.5, max_unit_price=4.0)
+        self.assertEqual(bound_updates(facet, [('L', 2.5)], [('L', 1.2)]), ('L', 1.2, 1.2))
+        self.assertEqual(bound_updates(facet, [('kg', 1.5)], [('kg', 9.0)]), ('L', None, None))
+        self.assertIsNone(bound_updates(facet, [('L', 1.5)], [('L', 2.0)]))
+        self.assertIsNone(bound_updates(facet, [('L', 4.0)], []))
+
+    def test_first_price_sets_the_facet_unit(self):
+        facet = frappe._dict(normalized_unit=None, min_unit_price=None, max_unit_price=None)
+        self.assertEqual(bound_updates(facet, [], [('kg', 3.0), ('kg', 5.0)]), ('kg', 3.0, 5.0))
+        self.assertIsNone(bound_updates(facet, [], [('kg', 3.0), ('L', 5.0)]))
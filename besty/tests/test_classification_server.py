@@ -0,0 +1,69 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import os
+import socket
+import tempfile
+import threading
+
+from frappe.tests.utils import FrappeTestCase
+
+from besty.classification_server import ClassificationServer, MicroBatcher, receive_message, send_message
+
+
+def fake_classify(calls):
+    def classify(names):
+        calls.append(list(names))
+        return [{'category': name.upper()} for name in names]
+    return classify
+
+
+class TestClassificationServer(FrappeTestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        calls = []
+        batcher = MicroBatcher(fake_classify(calls), window=0.2)
+        results = {}
+
+        def submit(name):
+            results[name] = batcher.submit([name, f'{name} 2'], timeout=5)
+
+        threads = [threading.Thread(target=submit, args=(name,)) for name in ('milk', 'bread', 'eggs')]
+        for thread in threads:
+            thread.start()
+        batcher.run_batch(batcher.next_batch())
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(calls[0]), 6)
+        self.assertEqual(results['bread'], [{'category': 'BREAD'}, {'category': 'BREAD 2'}])
+
+    def test_errors_reach_every_request(self):
+        def classify(names):
+            raise RuntimeError('model failed')
+
+        batcher = MicroBatcher(classify)
+        thread = threading.Thread(target=lambda: batcher.run_batch(batcher.next_batch()))
+        thread.start()
+        self.assertRaises(RuntimeError, batcher.submit, ['milk'], 5)
+        thread.join()
+
+    def test_socket_round_trip(self):
+        calls = []
+        batcher = MicroBatcher(fake_classify(calls))
+        with tempfile.TemporaryDirectory() as directory:
+            socket_path = os.path.join(directory, 'classifier.sock')
+            server = ClassificationServer(socket_path, batcher)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            threading.Thread(target=batcher.run, daemon=True).start()
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                    client.settimeout(5)
+                    client.connect(socket_path)
+                    for name in ('milk', 'cheese'):
+                        send_message(client, {'names': [name]})
+                        self.assertEqual(receive_message(client), {'results': [{'category': name.upper()}]})
+            finally:
+                batcher.stopped.set()
+                server.shutdown()
+                server.server_close()
@@ -0,0 +1,50 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import importlib.util
+import unittest
+
+from frappe.tests.utils import FrappeTestCase
+
+from besty.benchmarks.classifier_benchmark import load_corpus
+from besty.embedding_backends import load_model
+from besty.frappe_product_classifier import ProductClassifier, classifier_version
+
+# Fraction of corpus names an optimized backend must classify like torch
+MIN_AGREEMENT = 0.99
+
+
+def installed(*modules):
+    return all(importlib.util.find_spec(module) for module in modules)
+
+
+class TestEmbeddingBackends(FrappeTestCase):
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, load_model, 'all-MiniLM-L6-v2', 'tpu')
+
+    def test_version_names_backend(self):
+        self.assertEqual(classifier_version(backend='torch'), classifier_version())
+        self.assertTrue(classifier_version(backend='onnx').endswith('|onnx'))
+        self.assertEqual(classifier_version(semantic=False, backend='onnx'), classifier_version(semantic=False))
+
+    def assert_parity(self, backend):
+        names = [product_name for product_name, expected in load_corpus()]
+        reference = ProductClassifier(cache_size=0).classify_many(names)
+        candidate = ProductClassifier(cache_size=0, backend=backend).classify_many(names)
+
+        agreeing = sum(
+            (a['category'], a['matched_word']) == (b['category'], b['matched_word'])
+            for a, b in zip(reference, candidate)
+        )
+        self.assertGreaterEqual(agreeing / len(names), MIN_AGREEMENT)
+
+    @unittest.skipUnless(installed('torch', 'sentence_transformers'), "torch and sentence-transformers required")
+    def test_int8_parity(self):
+        self.assert_parity('int8')
+
+    @unittest.skipUnless(
+        installed('torch', 'sentence_transformers', 'onnxruntime', 'optimum'),
+        "sentence-transformers with onnxruntime and optimum required"
+    )
+    def test_onnx_parity(self):
+        self.assert_parity('onnx')
@@ -0,0 +1,28 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from besty.api.ingest import clean_rows, diff_row
+
+
+class TestIngest(FrappeTestCase):
+    def test_clean_rows_keys_and_rejects(self):
+        rows, errors = clean_rows([
+            {'product_id': '1', 'productname': ' Milk 2L ', 'current_price': '4.50'},
+            {'product_id': '2'},
+            {'product_id': '1', 'productname': 'Milk 2L', 'current_price': 4.2},
+            'Milk 2L',
+        ], 'Woolworths')
+        self.assertEqual(list(rows), [('Woolworths', '1')])
+        self.assertEqual(rows[('Woolworths', '1')]['current_price'], 4.2)
+        self.assertEqual([error['index'] for error in errors], [1, 3])
+
+    def test_diff_row_only_reports_supplied_changes(self):
+        current = frappe._dict(productname='Milk 2L', size='2L', current_price=4.5, unit_price=2.25)
+        self.assertEqual(diff_row(current, {'productname': 'Milk 2L', 'current_price': 4.5}), {})
+        self.assertEqual(
+            diff_row(current, {'productname': 'Milk 2L', 'current_price': 4.0, 'size': '2L'}),
+            {'current_price': 4.0}
+        )
@@ -0,0 +1,58 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import os
+import tempfile
+
+import numpy as np
+from frappe.tests.utils import FrappeTestCase
+
+from besty.keyword_embeddings import KeywordEmbeddingStore
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer that records what it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, words, **kwargs):
+        self.encoded.extend(words)
+        vectors = np.array([[len(word), sum(map(ord, word)) % 97, 1.0] for word in words], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestKeywordEmbeddings(FrappeTestCase):
+    def test_only_new_keywords_are_encoded(self):
+        model = FakeModel()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'bread', 'cheese'], cache_dir=cache_dir)
+            self.assertEqual(model.encoded, ['milk', 'bread', 'cheese'])
+
+            second = KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'kumara', 'cheese'], cache_dir=cache_dir)
+            self.assertEqual(model.encoded, ['milk', 'bread', 'cheese', 'kumara'])
+            self.assertEqual(second.encoded, 1)
+            np.testing.assert_allclose(second.get('cheese'), first.get('cheese'))
+            self.assertEqual(second.top_k(second.get('kumara'), k=1)[0][0], 'kumara')
+
+            third = KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'bread', 'cheese', 'kumara'], cache_dir=cache_dir)
+            self.assertEqual(third.encoded, 0)
+            self.assertEqual(len(model.encoded), 4)
+
+    def test_interleaved_saves_keep_keywords_and_rows_together(self):
+        model = FakeModel()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'bread'], cache_dir=cache_dir)
+            first = KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'bread', 'kumara'], cache_dir=cache_dir)
+            second = KeywordEmbeddingStore(lambda: model, 'fake', ['milk', 'bread', 'feijoa'], cache_dir=cache_dir)
+
+            # Two workers that each added a different keyword finish writing in opposite order
+            first_path = first.write_temp(first.matrix, first.keywords)
+            second_path = second.write_temp(second.matrix, second.keywords)
+            os.replace(second_path, second.cache_path)
+            os.replace(first_path, first.cache_path)
+
+            keywords, matrix = first.read_cache()
+            self.assertEqual(keywords, ['milk', 'bread', 'kumara'])
+            np.testing.assert_allclose(matrix, model.encode(keywords))
+            self.assertEqual([name for name in os.listdir(cache_dir) if name.endswith('.tmp')], [])
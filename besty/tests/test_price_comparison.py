@@ -0,0 +1,52 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from besty.price_comparison import best_offers, comparison_key
+from besty.unit_normalization import normalize_size, normalized_unit_price, normalized_unit_prices, parse_size
+
+
+class TestPriceComparison(FrappeTestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size('500g'), (500, 'g'))
+        self.assertEqual(parse_size('1.5L'), (1500, 'ml'))
+        self.assertEqual(parse_size('2 x 500g'), (1000, 'g'))
+        self.assertEqual(parse_size('6pk'), (6, 'ea'))
+        self.assertEqual(parse_size('each'), (1, 'ea'))
+        self.assertEqual(parse_size('1kg bag'), (1000, 'g'))
+        self.assertIsNone(parse_size('large'))
+        self.assertIsNone(parse_size(None))
+
+    def test_size_falls_back_to_unit_quantity(self):
+        self.assertEqual(normalize_size('', 'kg', 0.5), (500, 'g'))
+        self.assertIsNone(normalize_size('', 'kg', 0))
+
+    def test_normalized_unit_prices(self):
+        self.assertEqual(normalized_unit_prices([
+            (4.5, '2L', None, None),
+            (3, '2 x 500g', None, None),
+            (6, '6pk', None, None),
+            (12.99, 'per kg', 'kg', 1),
+            (5, 'large', None, None),
+            (0, '1L', None, None),
+        ]), [('L', 2.25), ('kg', 3.0), ('ea', 1.0), ('kg', 12.99), (None, None), (None, None)])
+        self.assertEqual(normalized_unit_price(2.5, '', 'kg', 0.5), ('kg', 5.0))
+
+    def test_equivalent_sizes_share_a_key(self):
+        self.assertEqual(comparison_key('Milk', '2L'), comparison_key('milk', '2000ml'))
+        self.assertEqual(comparison_key('Milk', '2L'), 'milk|2000ml')
+        self.assertNotEqual(comparison_key('Milk', '2L'), comparison_key('Milk', '1L'))
+        self.assertIsNone(comparison_key(None, '2L'))
+
+    def test_best_offers_keeps_cheapest_per_site(self):
+        rows = [
+            frappe._dict(name=1, productname='A', source_site='Woolworths', size='2L', image_url=None,
+                current_price=4.0, unit_price=2.0, unit_name='L'),
+            frappe._dict(name=2, productname='B', source_site='Pak n Save', size='2L', image_url=None,
+                current_price=4.2, unit_price=2.1, unit_name='L'),
+            frappe._dict(name=3, productname='C', source_site='Woolworths', size='2L', image_url=None,
+                current_price=5.0, unit_price=2.5, unit_name='L'),
+        ]
+        self.assertEqual([offer['product'] for offer in best_offers(rows)], [1, 2])
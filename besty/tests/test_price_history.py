@@ -0,0 +1,37 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+from datetime import datetime
+
+from frappe.tests.utils import FrappeTestCase
+
+from besty.price_history import parse_price_history, price_row
+
+
+class TestPriceHistory(FrappeTestCase):
+    def test_parse_json_list_of_objects(self):
+        self.assertEqual(
+            parse_price_history('[{"date": "2025-01-02", "price": 4.5}, {"date": "2025-01-09", "price": "4.20"}]'),
+            [(datetime(2025, 1, 2), 4.5), (datetime(2025, 1, 9), 4.2)]
+        )
+
+    def test_parse_json_mapping_and_pairs(self):
+        self.assertEqual(parse_price_history('{"2025-01-02": 3}'), [(datetime(2025, 1, 2), 3.0)])
+        self.assertEqual(parse_price_history('[["2025-01-02 10:00:00", 3]]'), [(datetime(2025, 1, 2, 10), 3.0)])
+
+    def test_parse_lines(self):
+        self.assertEqual(
+            parse_price_history('2025-01-02, $3.99\ngarbage\n2025-01-03: 4'),
+            [(datetime(2025, 1, 2), 3.99), (datetime(2025, 1, 3), 4.0)]
+        )
+
+    def test_unreadable_history_is_empty(self):
+        self.assertEqual(parse_price_history(None), [])
+        self.assertEqual(parse_price_history('"4.99"'), [])
+        self.assertEqual(parse_price_history('[{"price": 2}]'), [])
+
+    def test_price_rows_are_named_by_observation(self):
+        name = price_row(7, '4.50', '2025-01-02 10:00:00')[0]
+        self.assertEqual(price_row(7, 4.5, datetime(2025, 1, 2, 10))[0], name)
+        self.assertNotEqual(price_row(7, 4.6, datetime(2025, 1, 2, 10))[0], name)
+        self.assertNotEqual(price_row(8, 4.5, datetime(2025, 1, 2, 10))[0], name)
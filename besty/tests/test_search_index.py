@@ -0,0 +1,73 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import time
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from besty import search_index
+from besty.keyword_index import TrigramIndex
+from besty.api.product_search import decode_cursor, encode_cursor
+from besty.search_index import expand_term, get_vocabulary_index, keyset_condition, token_rows, tokenize
+
+
+class TestSearchIndex(FrappeTestCase):
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize("Wattie's Baked Beans 420g, Baked"),
+            ['watties', 'baked', 'beans', '420g']
+        )
+        self.assertEqual(tokenize('Coca-Cola 1.5L'), ['coca', 'cola', '1', '5l'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_token_rows_have_stable_names(self):
+        self.assertEqual(
+            token_rows(42, 'Anchor Blue Top Milk'),
+            [('42-0', 42, 'anchor'), ('42-1', 42, 'blue'), ('42-2', 42, 'top'), ('42-3', 42, 'milk')]
+        )
+
+    def test_short_terms_skip_typo_expansion(self):
+        expansion = expand_term('mi')
+        self.assertEqual(expansion['prefix'], 'mi%')
+        self.assertEqual(expansion['fuzzy'], [])
+        self.assertIsNone(expand_term('m')['prefix'])
+
+
+    def test_vocabulary_is_refreshed_off_the_request(self):
+        index = TrigramIndex(['bananas', 'bread'])
+        with patch.dict(search_index._vocabulary, {'index': index, 'loaded_at': 0.0, 'refreshing': False}), \
+                patch('besty.search_index.threading.Thread') as thread:
+            # An expired index keeps serving while a background thread reloads it, started once
+            self.assertIs(get_vocabulary_index(), index)
+            self.assertIs(get_vocabulary_index(), index)
+            self.assertEqual(thread.call_count, 1)
+            self.assertEqual(expand_term('banana')['fuzzy'], ['bananas'])
+
+    def test_new_tokens_join_the_vocabulary(self):
+        index = TrigramIndex(['bread'])
+        with patch.dict(search_index._vocabulary, {'index': index, 'loaded_at': time.monotonic()}):
+            index.add(['feijoas', 'bread'])
+            self.assertEqual(index.vocabulary, ['bread', 'feijoas'])
+            self.assertEqual(expand_term('feijoa')['fuzzy'], ['feijoas'])
+
+    def test_keyset_condition(self):
+        values = {}
+        self.assertEqual(
+            keyset_condition([('p.last_updated', 'desc'), ('p.name', 'desc')], ['2025-01-02', 7], values),
+            '(((p.last_updated < %(after_0)s or p.last_updated is null))'
+            ' or (p.last_updated <=> %(after_0)s and (p.name < %(after_1)s or p.name is null)))'
+        )
+        self.assertEqual(values, {'after_0': '2025-01-02', 'after_1': 7})
+
+        # Ascending NULLs come first, so every non-NULL value is still ahead
+        self.assertEqual(
+            keyset_condition([('p.unit_price', 'asc'), ('p.name', 'desc')], [None, 7], {}),
+            '((p.unit_price is not null) or (p.unit_price <=> %(after_0)s and (p.name < %(after_1)s or p.name is null)))'
+        )
+
+    def test_search_cursor(self):
+        cursor = encode_cursor('price', [4.5, 12])
+        self.assertEqual(decode_cursor(cursor, 'price'), (0, [4.5, 12]))
+        self.assertEqual(decode_cursor('40', 'price'), (40, None))
+        self.assertEqual(decode_cursor(None, 'price'), (0, None))
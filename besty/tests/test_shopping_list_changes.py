@@ -0,0 +1,31 @@
+# Copyright (c) 2026, Benjamen Walsh and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from besty.api.shopping_list import IN_BASKET, NOT_IN_BASKET, get_totals, in_basket_value, parse_operations
+
+
+class TestShoppingListChanges(FrappeTestCase):
+    def test_in_basket_value(self):
+        self.assertEqual(in_basket_value(True), IN_BASKET)
+        self.assertEqual(in_basket_value(0), NOT_IN_BASKET)
+        self.assertEqual(in_basket_value(IN_BASKET), IN_BASKET)
+        self.assertEqual(in_basket_value(None), NOT_IN_BASKET)
+
+    def test_totals_by_basket_and_shop(self):
+        totals = get_totals([
+            frappe._dict(price=4.5, quantity=2, inbasket=IN_BASKET, source_site='paknsave.co.nz'),
+            frappe._dict(price=3, quantity=1, inbasket=NOT_IN_BASKET, source_site='paknsave.co.nz'),
+            frappe._dict(price=2.25, quantity=4, inbasket=NOT_IN_BASKET, source_site='woolworths.co.nz'),
+        ], 'price')
+        self.assertEqual((totals['subtotal'], totals['in_basket'], totals['not_in_basket']), (21.0, 9.0, 12.0))
+        self.assertEqual(totals['by_source_site']['paknsave.co.nz'],
+            {'subtotal': 12.0, 'in_basket': 9.0, 'not_in_basket': 3.0})
+
+    def test_malformed_operations_are_rejected(self):
+        self.assertEqual(parse_operations('[{"op": "add", "product": 12}]'), [{'op': 'add', 'product': 12}])
+        for operations in (None, '{"op": "add"}', ['add'], [{'op': 'rename', 'product': 12}], [{'op': 'add'}],
+                [{'op': 'remove', 'product': {'name': 12}}]):
+            self.assertRaises(frappe.ValidationError, parse_operations, operations)
@@ -0,0 +1,101 @@
+# apps/besty/besty/unit_normalization.py
+
+import re
+from functools import lru_cache
+
+from frappe.utils import flt
+
+# Unit spellings seen on supermarket sites -> (base unit, multiplier)
+UNITS = {
+    'mg': ('g', 0.001),
+    'g': ('g', 1), 'gm': ('g', 1), 'gr': ('g', 1), 'gram': ('g', 1), 'grams': ('g', 1),
+    'kg': ('g', 1000), 'kgs': ('g', 1000), 'kilo': ('g', 1000), 'kilogram': ('g', 1000),
+    'ml': ('ml', 1), 'cl': ('ml', 10), 'dl': ('ml', 100),
+    'l': ('ml', 1000), 'lt': ('ml', 1000), 'ltr': ('ml', 1000), 'litre': ('ml', 1000), 'liter': ('ml', 1000),
+    'ea': ('ea', 1), 'each': ('ea', 1), 'pk': ('ea', 1), 'pack': ('ea', 1), 'ct': ('ea', 1),
+    'pc': ('ea', 1), 'pcs': ('ea', 1), 'piece': ('ea', 1), 'pieces': ('ea', 1),
+}
+
+# Unit each base unit's price is quoted per -> (label, base units in one)
+STANDARD_UNITS = {'g': ('kg', 1000), 'ml': ('L', 1000), 'ea': ('ea', 1)}
+
+UNIT_PATTERN = '|'.join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+
+# "2 x 500g", "1.5L", "6pk", "500 ml"; a leading count multiplies the amount
+SIZE_PATTERN = re.compile(
+    rf'(?:(\d+)\s*[x×*]\s*)?(\d+(?:\.\d+)?)\s*({UNIT_PATTERN})\b'
+)
+BARE_UNIT_PATTERN = re.compile(rf'^\s*(?:per\s+|1\s*)?({UNIT_PATTERN})\s*$')
+
+
+@lru_cache(maxsize=8192)
+def parse_size(size):
+    """
+    Parse a size label into ``(quantity, base_unit)`` with base units g, ml and
+    ea, or return None when the label has no recognisable amount.
+    """
+    text = (size or '').lower().strip()
+    if not text:
+        return None
+
+    match = SIZE_PATTERN.search(text)
+    if match:
+        count, amount, unit = match.groups()
+        base_unit, multiplier = UNITS[unit]
+        quantity = float(amount) * multiplier * (int(count) if count else 1)
+        return (quantity, base_unit) if quantity > 0 else None
+
+    match = BARE_UNIT_PATTERN.match(text)
+    if match:
+        base_unit, multiplier = UNITS[match.group(1)]
+        return multiplier, base_unit
+    return None
+
+
+def normalize_size(size, unit_name=None, original_unit_quantity=None):
+    """
+    ``(quantity, base_unit)`` for a Product Item, read from ``size`` and falling
+    back to ``original_unit_quantity`` of ``unit_name`` when the size is blank
+    or unparseable.
+    """
+    parsed = parse_size(size)
+    if parsed:
+        return parsed
+
+    unit = parse_size(unit_name)
+    quantity = flt(original_unit_quantity)
+    if unit and quantity > 0:
+        return unit[0] * quantity, unit[1]
+    return None
+
+
+def size_label(quantity, base_unit):
+    """Canonical label such as ``500g`` or ``1500ml`` used to compare sizes."""
+    return f'{round(quantity, 3):g}{base_unit}'
+
+
+def normalized_unit_price(current_price, size, unit_name=None, original_unit_quantity=None):
+    """``(standard_unit, price per standard unit)`` for one Product Item, e.g. ``('L', 2.25)``."""
+    return normalized_unit_prices([(current_price, size, unit_name, original_unit_quantity)])[0]
+
+
+def normalized_unit_prices(rows):
+    """
+    Batch form of normalized_unit_price over ``(current_price, size, unit_name,
+    original_unit_quantity)`` tuples. Each distinct size is parsed once; rows
+    without a price or a parseable size get ``(None, None)``.
+    """
+    sizes = {}
+    results = []
+    for price, size, unit_name, original_unit_quantity in rows:
+        key = (size, unit_name, original_unit_quantity)
+        if key not in sizes:
+            sizes[key] = normalize_size(*key)
+        normalized = sizes[key]
+        price = flt(price)
+        if not normalized or normalized[0] <= 0 or price <= 0:
+            results.append((None, None))
+            continue
+        standard_unit, base_per_standard = STANDARD_UNITS[normalized[1]]
+        results.append((standard_unit, round(price * base_per_standard / normalized[0], 4)))
+    return results
@@ -0,0 +1,120 @@
+import { call } from 'frappe-ui';
+
+// Product Items cached in IndexedDB and kept current with besty.api.catalog.sync_catalog
+const DB_NAME = 'besty-catalog';
+const DB_VERSION = 1;
+const SYNC_METHOD = 'besty.api.catalog.sync_catalog';
+
+let dbPromise = null;
+
+const openDatabase = () => {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const db = request.result;
+        db.createObjectStore('products', { keyPath: 'name' });
+        db.createObjectStore('meta');
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+  return dbPromise;
+};
+
+const transactionDone = (tx) =>
+  new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+
+const requestResult = (request) =>
+  new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+
+const readCache = async () => {
+  const db = await openDatabase();
+  const tx = db.transaction(['products', 'meta'], 'readonly');
+  const [products, meta] = await Promise.all([
+    requestResult(tx.objectStore('products').getAll()),
+    requestResult(tx.objectStore('meta').get('sync')),
+  ]);
+  return { products, meta: meta || {} };
+};
+
+// Product Items are autoincrement-named; Deleted Document stores the name as text
+const productKey = (name) => (/^\d+$/.test(String(name)) ? Number(name) : name);
+
+// Apply one sync page: rows arrive as arrays in `fields` order
+const applyPage = async (page, clear) => {
+  const db = await openDatabase();
+  const tx = db.transaction(['products', 'meta'], 'readwrite');
+  const store = tx.objectStore('products');
+  if (clear) {
+    // Forget the watermark too, so an interrupted snapshot starts over
+    store.clear();
+    tx.objectStore('meta').delete('sync');
+  }
+  for (const row of page.rows) {
+    const product = Object.fromEntries(page.fields.map((field, i) => [field, row[i]]));
+    store.put(product);
+  }
+  for (const name of page.deleted) {
+    store.delete(productKey(name));
+  }
+  await transactionDone(tx);
+};
+
+const writeMeta = async (meta) => {
+  const db = await openDatabase();
+  const tx = db.transaction('meta', 'readwrite');
+  tx.objectStore('meta').put(meta, 'sync');
+  await transactionDone(tx);
+};
+
+// Bring the cached catalog up to date and return every product
+export const syncCatalog = async () => {
+  const { meta } = await readCache();
+  let params = { since: meta.watermark || null, version: meta.version || null };
+  let first = true;
+
+  while (true) {
+    const page = await call(SYNC_METHOD, params);
+    if (page.unchanged) break;
+
+    await applyPage(page, page.full && first);
+    first = false;
+    if (!page.next_cursor) {
+      await writeMeta({ watermark: page.watermark, version: page.version });
+      break;
+    }
+    params = { cursor: page.next_cursor };
+  }
+
+  return (await readCache()).products;
+};
+
+const byLastUpdated = (a, b) => String(b.last_updated || '').localeCompare(String(a.last_updated || ''));
+
+const fetchAll = async () => {
+  let products = [];
+  let params = {};
+  while (true) {
+    const page = await call(SYNC_METHOD, params);
+    products = products.concat(
+      page.rows.map((row) => Object.fromEntries(page.fields.map((field, i) => [field, row[i]])))
+    );
+    if (!page.next_cursor) return products;
+    params = { cursor: page.next_cursor };
+  }
+};
+
+// Every product, newest first, synced through IndexedDB where the browser has it
+export const loadCatalog = async () => {
+  const products = typeof indexedDB === 'undefined' ? await fetchAll() : await syncCatalog();
+  return products.sort(byLastUpdated);
+};